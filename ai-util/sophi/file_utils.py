@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import contextlib
+import io
 import os
 import re
 import subprocess
@@ -86,13 +88,55 @@ class FileUtils:
         gemini_client: t.Any,
         max_pages: int = 20,
     ) -> str:
-        extracted = self.extract_text_from_pdf(pdf_path)
+        text = self._extract_text_with_pypdf(pdf_path)
+        extracted = self._normalize_extracted_text(text) if text and text.strip() else ""
+        if self._looks_like_useful_text(extracted):
+            return self._format_syllabus_with_gemini(extracted, gemini_client=gemini_client)
+
+        return self._extract_syllabus_outline_fallback(
+            pdf_path, extracted, gemini_client=gemini_client, max_pages=max_pages
+        )
+
+    def extract_syllabus_outline_from_bytes(
+        self,
+        *,
+        pdf_bytes: bytes,
+        gemini_client: t.Any,
+        max_pages: int = 20,
+    ) -> str:
+        text = self._extract_text_with_pypdf(io.BytesIO(pdf_bytes))
+        extracted = self._normalize_extracted_text(text) if text and text.strip() else ""
         if self._looks_like_useful_text(extracted):
             return self._format_syllabus_with_gemini(extracted, gemini_client=gemini_client)
 
+        # pdftotext/pdftoppm fallbacks need a real file; pypdf already ran, so go straight to them
+        with self._spill_pdf_bytes(pdf_bytes) as pdf_path:
+            return self._extract_syllabus_outline_fallback(
+                pdf_path, extracted, gemini_client=gemini_client, max_pages=max_pages, pdf_bytes=pdf_bytes
+            )
+
+    def _extract_syllabus_outline_fallback(
+        self,
+        pdf_path: str,
+        extracted: str,
+        *,
+        gemini_client: t.Any,
+        max_pages: int,
+        pdf_bytes: bytes | None = None,
+    ) -> str:
+        # Everything after the pypdf attempt: pdftotext (only when pypdf found no text, as in
+        # extract_text_from_pdf), then page images, then the raw PDF bytes
+        if not extracted:
+            text = self._extract_text_with_pdftotext(pdf_path)
+            if text and text.strip():
+                extracted = self._normalize_extracted_text(text)
+                if self._looks_like_useful_text(extracted):
+                    return self._format_syllabus_with_gemini(extracted, gemini_client=gemini_client)
+
         page_images = self._pdf_to_png_pages(pdf_path, max_pages=max_pages)
         if not page_images:
-            pdf_bytes = self.read_bytes(pdf_path)
+            if pdf_bytes is None:
+                pdf_bytes = self.read_bytes(pdf_path)
             return self._extract_syllabus_from_pdf_bytes(pdf_bytes, gemini_client=gemini_client, max_pages=max_pages)
 
         chunks: list[str] = []
@@ -103,7 +147,18 @@ class FileUtils:
             return ""
         return self._format_syllabus_with_gemini(merged, gemini_client=gemini_client)
 
-    def _extract_text_with_pypdf(self, pdf_path: str) -> str | None:
+    @contextlib.contextmanager
+    def _spill_pdf_bytes(self, pdf_bytes: bytes) -> t.Iterator[str]:
+        # Prefer tmpfs so the spill never touches disk
+        tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        with tempfile.NamedTemporaryFile(suffix=".pdf", dir=tmp_dir, delete=False) as f:
+            f.write(pdf_bytes)
+        try:
+            yield f.name
+        finally:
+            os.remove(f.name)
+
+    def _extract_text_with_pypdf(self, pdf_path: str | t.BinaryIO) -> str | None:
         try:
             from PyPDF2 import PdfReader  # type: ignore
         except Exception:
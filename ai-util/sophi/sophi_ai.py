@@ -1484,6 +1484,24 @@ class SophiAIUtil:
             class_name=class_name,
         )
 
+    def create_class_file_from_bytes(
+        self,
+        *,
+        syllabus_pdf_bytes: bytes,
+        class_name: str | None = None,
+        max_pages_per_pdf: int = 20,
+    ) -> ClassFile:
+        syllabus_text = self.file_utils.extract_syllabus_outline_from_bytes(
+            pdf_bytes=syllabus_pdf_bytes,
+            gemini_client=self.gemini,
+            max_pages=max_pages_per_pdf,
+        )
+        return self.create_class_file(
+            syllabus_text=syllabus_text,
+            practice_problems_text="",
+            class_name=class_name,
+        )
+
     def save_class_file(self, *, path: str, class_file: ClassFile) -> None:
         os.makedirs(os.path.dirname(path), exist_ok=True)
         with open(path, "w", encoding="utf-8") as f:
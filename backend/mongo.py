@@ -1,12 +1,16 @@
 import os
 from typing import Any
 
+from gridfs import GridFSBucket
 from pymongo import MongoClient
 from pymongo.errors import ServerSelectionTimeoutError
 from pymongo.server_api import ServerApi
 
 _client = None
 
+# zstd comes from zstandard in requirements.txt; zlib is the fallback for servers without zstd
+COMPRESSORS = "zstd,zlib"
+
 def connect(timeout_ms: int = 5000) -> Any:
     global _client
     uri = os.getenv("MONGO_URI")
@@ -21,7 +25,13 @@ def connect(timeout_ms: int = 5000) -> Any:
         _client = MongoClient(
             uri,
             server_api=ServerApi('1'),
-            serverSelectionTimeoutMS=timeout_ms
+            serverSelectionTimeoutMS=timeout_ms,
+            maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", "200")),
+            minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", "16")),
+            compressors=COMPRESSORS,
+            retryWrites=True,
+            w="majority",
+            readPreference="primaryPreferred"
         )
         try:
             _client.admin.command("ping")
@@ -30,4 +40,7 @@ def connect(timeout_ms: int = 5000) -> Any:
             raise RuntimeError("Unable to connect to MongoDB") from exc
         print("Connected To MongoDB!")
 
-    return _client[db_name]
\ No newline at end of file
+    return _client[db_name]
+
+def bucket(bucket_name: str = "fs") -> GridFSBucket:
+    return GridFSBucket(connect(), bucket_name=bucket_name)
@@ -0,0 +1,13 @@
+import re
+
+# Vite names bundles after their content hash (assets/index-B9xK2c_d.js), so a URL never changes
+# meaning and can be cached for a year. index.html points at the current hashed bundles, so it
+# (and anything else in the build) must be revalidated instead.
+IMMUTABLE_MAX_AGE = 31536000
+
+_HASHED_ASSET_RE = re.compile(r"assets/.+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+")
+
+
+def is_hashed_asset(path: str) -> bool:
+    """True for a content-hashed bundle; takes the path relative to the build or the URL path."""
+    return _HASHED_ASSET_RE.fullmatch(path.lstrip("/")) is not None
@@ -0,0 +1,20 @@
+"""Gunicorn settings for serving the Flask app.
+
+Usage:
+  gunicorn -c gunicorn.conf.py main:server
+  gunicorn -c gunicorn.conf.py -w 1 wsgi:server
+
+gevent workers let each process keep many requests in flight while they wait on
+Gemini, Wolfram or MongoDB, instead of one request per worker. The in-memory
+mock server keeps its data in process memory, so it runs as a single worker.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+worker_class = "gevent"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_connections = 1000
+keepalive = 30
+# No preload_app: main.py opens its MongoClient at import, and pymongo clients must not
+# cross a fork. The mock runs a single worker, so there is nothing to share copy-on-write.
+preload_app = False
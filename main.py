@@ -1,16 +1,29 @@
 import traceback
 import sys
 import os
-import tempfile
-import json
-from dataclasses import dataclass, asdict
+import hashlib
+import io
+import datetime
+import queue
+import threading
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from typing import List, Dict, Any, Optional
 
 import bson
-from bson import Binary, ObjectId
-from flask import Flask, jsonify, request
+import gridfs
+import orjson
+import pymongo.errors
+from bson import ObjectId
+from cachetools import TTLCache
+from flask import Flask, Response, jsonify, request, send_file, send_from_directory
 
-from backend.mongo import connect
+from backend.json_provider import OrjsonProvider
+from backend.mongo import bucket, connect
+from backend.static_assets import IMMUTABLE_MAX_AGE, is_hashed_asset
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sophi_path = os.path.join(current_dir, "ai-util", "sophi")
@@ -24,11 +37,78 @@ except ImportError as e:
     print(f"Error importing AI modules: {e}")
     SophiAIUtil = None
 
+try:
+    import gevent
+    from gevent import monkey as gevent_monkey
+except ImportError:
+    gevent = None
+
 server = Flask(__name__, static_folder="frontend/dist", static_url_path="")
+server.json = OrjsonProvider(server)
+# Behind nginx/Apache, hand static files (index.html, hashed bundles) to the proxy via
+# X-Sendfile instead of streaming them through the worker
+server.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE", "").lower() in ("1", "true", "yes")
 mongo = connect()
+# Uploaded PDFs live in GridFS; class/session documents only keep the filename and fileId
+files = bucket()
+
+# Extracted class files keyed by the SHA-256 of the syllabus PDF, expired after 90 days
+CLASS_FILE_CACHE_TTL_SECONDS = 90 * 24 * 60 * 60
+mongo.class_file_cache.create_index([("created", 1)], expireAfterSeconds=CLASS_FILE_CACHE_TTL_SECONDS)
+mongo.pending_questions.create_index([("questionId", 1)], unique=True)
+# At most one pending question per session; the insert that claims it is the cross-worker
+# guard in requestQuestion
+try:
+    mongo.pending_questions.create_index([("sessionID", 1)], unique=True)
+except pymongo.errors.OperationFailure:
+    # Older deployments have a plain sessionID index, which can't be changed in place
+    mongo.pending_questions.drop_index([("sessionID", 1)])
+    mongo.pending_questions.create_index([("sessionID", 1)], unique=True)
+mongo.sessions.create_index([("classID", 1), ("_id", -1)])
 
 ai_util = SophiAIUtil() if SophiAIUtil else None
 
+# Independent Mongo writes are issued from here so they overlap instead of queueing
+_write_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="mongo-write")
+
+# Gemini calls that don't need to hold up the response (e.g. topic tagging) run here
+_ai_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ai")
+
+# Most recent answered questions sent to the AI as history
+HISTORY_WINDOW = 20
+
+# A request that finds its session's question still being generated polls for it this
+# often, and treats the claim as abandoned after the timeout
+PENDING_POLL_SECONDS = 0.5
+PENDING_CLAIM_TIMEOUT_SECONDS = 120
+
+# Response shape the validation prompt asks Gemini for
+VALIDATION_OUTPUT_CONTRACT = {
+    "ok": "boolean",
+    "feedback": "string"
+}
+
+# Serializes question generation per session within this worker (the pending_questions
+# claim in requestQuestion covers other workers).
+# Each entry is [lock, holders] and is dropped when the last holder leaves, so the map
+# only ever holds sessions with a request in flight.
+_session_locks: Dict[ObjectId, List[Any]] = {}
+_session_locks_guard = threading.Lock()
+
+@contextmanager
+def _session_lock(session_id: ObjectId):
+    with _session_locks_guard:
+        entry = _session_locks.setdefault(session_id, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _session_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _session_locks[session_id]
+
 @dataclass
 class Question:
     content: str
@@ -38,15 +118,29 @@ class Question:
     questionId: str # Added to track specific questions
     metadata: Dict[str, Any] # Added to store AI metadata (validation prompt, etc.)
 
+    # Built by hand (here and in the other models) instead of paying for asdict()'s recursive deep copy
+    def to_doc(self) -> Dict[str, Any]:
+        return {
+            "content": self.content,
+            "userAnswer": self.userAnswer,
+            "aiAnswer": self.aiAnswer,
+            "wasUserCorrect": self.wasUserCorrect,
+            "questionId": self.questionId,
+            "metadata": self.metadata
+        }
+
 @dataclass
 class FileUpload:
     filename: str
-    data: Binary
+    fileId: Optional[ObjectId]
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {"filename": self.filename, "fileId": self.fileId}
 
 @dataclass
 class Session:
     name: str
-    classID: str
+    classID: ObjectId
     adaptive: bool
     difficulty: float
     isCumulative : bool
@@ -54,11 +148,26 @@ class Session:
     customRequests: str #optional
     file: FileUpload #optional
 
+    def to_doc(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "classID": self.classID,
+            "adaptive": self.adaptive,
+            "difficulty": self.difficulty,
+            "isCumulative": self.isCumulative,
+            "selectedTopics": self.selectedTopics,
+            "customRequests": self.customRequests,
+            "file": self.file.to_doc()
+        }
+
 @dataclass
 class Metric:
     rightAnswers: int
     totalAnswers: int
 
+    def to_doc(self) -> Dict[str, Any]:
+        return {"rightAnswers": self.rightAnswers, "totalAnswers": self.totalAnswers}
+
 @dataclass
 class Class:
     syllabus: FileUpload
@@ -70,6 +179,205 @@ class Class:
     sessions: List[Session]
     classFile: Optional[Dict[str, Any]] = None # To store processed ClassFile from AI
 
+    def to_doc(self) -> Dict[str, Any]:
+        return {
+            "syllabus": self.syllabus.to_doc(),
+            "styleFiles": [sf.to_doc() for sf in self.styleFiles],
+            "name": self.name,
+            "professor": self.professor,
+            "topics": self.topics,
+            "metrics": {topic: metric.to_doc() for topic, metric in self.metrics.items()},
+            "sessions": [session.to_doc() for session in self.sessions],
+            "classFile": self.classFile
+        }
+
+# Process-local caches for read-mostly GETs. Writes pop the affected key; the TTL bounds
+# how stale another worker process can be.
+READ_CACHE_TTL_SECONDS = 60
+
+_topics_cache = TTLCache(maxsize=1024, ttl=READ_CACHE_TTL_SECONDS)
+
+# Write-through copy of pending questions this worker generated, so the usual
+# requestQuestion -> submitAnswer round trip skips the pending_questions read. Mongo
+# stays the source of truth for other workers and for misses.
+PENDING_CACHE_TTL_SECONDS = 30 * 60
+_pending_cache = TTLCache(maxsize=4096, ttl=PENDING_CACHE_TTL_SECONDS)
+# Topic-tagging futures for those questions, so submitAnswer can wait on one still in flight
+_topic_jobs = TTLCache(maxsize=4096, ttl=PENDING_CACHE_TTL_SECONDS)
+TOPIC_WAIT_SECONDS = 30
+_cache_lock = threading.Lock() # TTLCache is not thread-safe
+
+def _cache_get(cache: TTLCache, key: str):
+    with _cache_lock:
+        return cache.get(key)
+
+def _cache_put(cache: TTLCache, key: str, value):
+    with _cache_lock:
+        cache[key] = value
+
+def _cache_pop(cache: TTLCache, key: str):
+    with _cache_lock:
+        cache.pop(key, None)
+
+def _cache_update(cache: TTLCache, key: str, fields: Dict[str, Any]):
+    # Merges into an entry only if it is still cached; one lock hold so a concurrent pop can't be undone
+    with _cache_lock:
+        current = cache.get(key)
+        if current is not None:
+            cache[key] = {**current, **fields}
+
+def _conditional_json(payload):
+    # ETag from the body so browsers can revalidate with If-None-Match and get a bodiless 304
+    response = jsonify(payload)
+    response.add_etag()
+    return response.make_conditional(request)
+
+@lru_cache(maxsize=4096)
+def _oid(value: str) -> ObjectId:
+    # Route IDs repeat a lot (polling, retries), so parse each one once
+    return ObjectId(value)
+
+def _ref_oid(value):
+    # Documents written before references were stored as ObjectId still hold the hex string
+    if isinstance(value, str):
+        try:
+            return _oid(value)
+        except bson.errors.InvalidId:
+            return None
+    return value
+
+# Syllabus extraction (PDF parse + LLM) runs on a background worker so createClass returns right away.
+# Progress is stored on the class document (classFileProgress) so any server worker can stream it
+# to clients over SSE from /api/classProgress; the worker running the job also keeps it in memory
+# to wake its own streams without polling.
+PROGRESS_HEARTBEAT_SECONDS = 120
+PROGRESS_POLL_SECONDS = 1
+# A job that hasn't reported progress for this long was lost (worker restart or crash)
+PROGRESS_STALE_SECONDS = 15 * 60
+
+_class_jobs = queue.Queue()
+_class_worker = None
+_class_worker_lock = threading.Lock()
+_class_progress: Dict[str, Dict[str, Any]] = {}
+_class_progress_changed = threading.Condition()
+
+def _publish_progress(class_id: str, status: str, pct: int):
+    progress = {"status": status, "pct": pct}
+    mongo.classes.update_one(
+        {"_id": _oid(class_id)},
+        {"$set": {"classFileProgress": {**progress, "updatedAt": datetime.datetime.utcnow()}}}
+    )
+    with _class_progress_changed:
+        if status in ("done", "failed"):
+            # Finished jobs are served from the class document from here on
+            _class_progress.pop(class_id, None)
+        else:
+            _class_progress[class_id] = progress
+        _class_progress_changed.notify_all()
+
+def _stored_progress(class_id: str) -> Optional[Dict[str, Any]]:
+    doc = mongo.classes.find_one({"_id": _oid(class_id)}, {"classFileProgress": 1})
+    stored = doc.get("classFileProgress") if doc else None
+    if not stored:
+        return None
+
+    progress = {"status": stored["status"], "pct": stored["pct"]}
+    updated_at = stored.get("updatedAt")
+    if progress["status"] not in ("done", "failed") and (
+        updated_at is None
+        or (datetime.datetime.utcnow() - updated_at).total_seconds() > PROGRESS_STALE_SECONDS
+    ):
+        # Nothing will ever finish this job, so report it failed instead of streaming forever
+        return {"status": "failed", "pct": 100}
+    return progress
+
+def _ensure_class_worker():
+    # Started lazily so forked server workers each get their own thread
+    global _class_worker
+    with _class_worker_lock:
+        if _class_worker is None or not _class_worker.is_alive():
+            _class_worker = threading.Thread(target=_run_class_jobs, name="class-file-worker", daemon=True)
+            _class_worker.start()
+
+def _run_in_os_thread(fn, **kwargs):
+    # Under gunicorn's gevent workers threading.Thread is a greenlet, so CPU-bound work (the PDF
+    # parse) would stall every request on the worker. gevent's threadpool runs it on a real thread
+    # and only this greenlet waits for it.
+    if gevent is not None and gevent_monkey.is_module_patched("threading"):
+        return gevent.get_hub().threadpool.apply(fn, kwds=kwargs)
+    return fn(**kwargs)
+
+def _run_class_jobs():
+    while True:
+        job = _class_jobs.get()
+        try:
+            _process_class_job(**job)
+        finally:
+            _class_jobs.task_done()
+
+def _process_class_job(class_id: str, file_id: ObjectId, class_name: str, fingerprint: str):
+    try:
+        _publish_progress(class_id, "extracting", 40)
+        syllabus_bytes = files.open_download_stream(file_id).read()
+        generated_class_file = _run_in_os_thread(
+            ai_util.create_class_file_from_bytes,
+            syllabus_pdf_bytes=syllabus_bytes,
+            class_name=class_name
+        )
+
+        _publish_progress(class_id, "saving", 90)
+        class_file_data = generated_class_file.to_dict()
+        mongo.classes.update_one(
+            {"_id": _oid(class_id)},
+            {"$set": {
+                "classFile": class_file_data,
+                "topics": generated_class_file.concepts
+            }}
+        )
+        _cache_pop(_topics_cache, class_id)
+        # $setOnInsert keeps the first result if the same syllabus was extracted concurrently
+        mongo.class_file_cache.update_one(
+            {"_id": fingerprint},
+            {"$setOnInsert": {
+                "classFile": class_file_data,
+                "topics": generated_class_file.concepts,
+                "created": datetime.datetime.utcnow()
+            }},
+            upsert=True
+        )
+        _publish_progress(class_id, "done", 100)
+    except Exception as e:
+        print(f"Error generating class file: {e}")
+        traceback.print_exc()
+        _publish_progress(class_id, "failed", 100)
+
+# Uploads are consumed in chunks of this size instead of being read into memory whole
+UPLOAD_CHUNK_SIZE = 1 << 16
+
+def _upload_file(file_storage) -> FileUpload:
+    file_id = files.upload_from_stream(
+        file_storage.filename,
+        file_storage.stream,
+        metadata={"contentType": file_storage.mimetype}
+    )
+    return FileUpload(filename=file_storage.filename, fileId=file_id)
+
+def _sha256_stream(stream) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+def _delete_files(file_ids):
+    for file_id in file_ids:
+        if file_id is None:
+            continue
+        try:
+            files.delete(file_id)
+        except gridfs.errors.NoFile:
+            pass
+
 @server.route("/api/hello")
 def hello():
     return jsonify({"message": "API Working!"})
@@ -98,81 +406,110 @@ def create_class():
         return jsonify({"error": "No syllabus file provided"}), 400
 
     syllabus_file = request.files["syllabus"]
-    syllabus_bytes = syllabus_file.read()
+    fingerprint = _sha256_stream(syllabus_file.stream)
+    syllabus_file_obj = _upload_file(syllabus_file)
 
-    syllabus_file_obj = FileUpload(
-        filename=syllabus_file.filename,
-        data=Binary(syllabus_bytes)
-    )
+    style_files = [
+        _upload_file(sf)
+        for sf in request.files.getlist("styleFiles")
+        if sf and sf.filename
+    ]
 
-    style_files = []
-    for sf in request.files.getlist("styleFiles"):
-        if sf and sf.filename:
-            style_files.append(FileUpload(
-                filename=sf.filename,
-                data=Binary(sf.read())
-            ))
+    class_name = request.form.get("name", "Untitled Class")
 
-    class_file_data = None
-    extracted_topics = []
-
-    if ai_util:
-        try:
-            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_syllabus:
-                tmp_syllabus.write(syllabus_bytes)
-                tmp_syllabus_path = tmp_syllabus.name
-            
-            try:
-                generated_class_file = ai_util.create_class_file_from_pdfs(
-                    syllabus_pdf_path=tmp_syllabus_path,
-                    problem_pdf_paths=[],
-                    class_name=request.form.get("name", "Untitled Class")
-                )
-                
-                class_file_data = generated_class_file.to_dict()
-                extracted_topics = generated_class_file.concepts
-                
-            finally:
-                if os.path.exists(tmp_syllabus_path):
-                    os.remove(tmp_syllabus_path)
-                    
-        except Exception as e:
-            print(f"Error generating class file: {e}")
-            traceback.print_exc()
+    # Same syllabus seen before -> reuse its extraction instead of re-running the AI
+    cached = mongo.class_file_cache.find_one({"_id": fingerprint}, {"classFile": 1, "topics": 1})
 
     class_doc = Class(
         syllabus=syllabus_file_obj,
         styleFiles=style_files,
-        name=request.form.get("name", "Untitled Class"),
+        name=class_name,
         professor=request.form.get("professor", "Unknown"),
-        topics=extracted_topics,
+        topics=cached.get("topics", []) if cached else [],
         sessions=[],
-        classFile=class_file_data,
+        classFile={**cached["classFile"], "class_name": class_name} if cached else None, # Otherwise filled in by the class-file worker
         metrics={}
     )
 
-    result = mongo.classes.insert_one(asdict(class_doc))
+    result = mongo.classes.insert_one(class_doc.to_doc())
+    class_id = str(result.inserted_id)
+
+    if ai_util and not cached:
+        # The worker reads the syllabus back from GridFS, so nothing is spooled to disk here
+        _publish_progress(class_id, "queued", 0)
+        _class_jobs.put({
+            "class_id": class_id,
+            "file_id": syllabus_file_obj.fileId,
+            "class_name": class_name,
+            "fingerprint": fingerprint
+        })
+        _ensure_class_worker()
+    elif cached:
+        # Nothing to extract, but clients still open /api/classProgress for the new class
+        _publish_progress(class_id, "done", 100)
 
     return jsonify({
-        "classID": str(result.inserted_id)
+        "classID": class_id
     })
 
+@server.route("/api/classProgress/<classID>", methods=["GET"])
+def class_progress(classID):
+    try:
+        _oid(classID)
+    except bson.errors.InvalidId:
+        return jsonify({"error": "Invalid classID"}), 400
+
+    with _class_progress_changed:
+        running_here = classID in _class_progress
+    if not running_here and _stored_progress(classID) is None:
+        return jsonify({"error": "No class file job for this class"}), 404
+
+    def stream():
+        last_sent = None
+        last_write = time.monotonic()
+        while True:
+            with _class_progress_changed:
+                event = _class_progress.get(classID)
+                # The first event goes out right away; after that, wait for a change or poll
+                if last_sent is not None and event in (None, last_sent):
+                    _class_progress_changed.wait(timeout=PROGRESS_POLL_SECONDS)
+                    event = _class_progress.get(classID)
+            if event is None:
+                # Job running in another worker (or already finished), so read it from Mongo
+                event = _stored_progress(classID)
+                if event is None:
+                    return # Class deleted
+
+            if event == last_sent:
+                if time.monotonic() - last_write >= PROGRESS_HEARTBEAT_SECONDS:
+                    last_write = time.monotonic()
+                    yield ": heartbeat\n\n"
+                continue
+
+            last_sent = event
+            last_write = time.monotonic()
+            yield f"data: {orjson.dumps(event).decode()}\n\n"
+            if event["status"] in ("done", "failed"):
+                return
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @server.route("/api/createSession/<classID>", methods=["POST"])
 def create_session(classID):
+    try:
+        class_obj_id = _oid(classID)
+    except bson.errors.InvalidId:
+        return jsonify({"error": "Invalid classID"}), 400
+
     file_storage = request.files.get("file")
     if file_storage and file_storage.filename:
-        file_bin = Binary(file_storage.read())
+        file_doc = _upload_file(file_storage)
     else:
-        file_bin = None
-
-    file_doc = FileUpload(
-        filename=file_storage.filename if file_storage else "",
-        data=file_bin
-    )
+        file_doc = FileUpload(filename="", fileId=None)
 
     session = Session(
         name=request.form.get("name", "New Session"),
-        classID=classID,
+        classID=class_obj_id,
         adaptive=request.form.get("adaptive", "false").lower() == "true",
         difficulty=float(request.form.get("difficulty", 0.5)), # 0.0 to 1.0, map to 1-5 for AI
         isCumulative=request.form.get("cumulative", "false").lower() == "true",
@@ -181,7 +518,7 @@ def create_session(classID):
         file=file_doc
     )
 
-    result = mongo.sessions.insert_one(asdict(session))
+    result = mongo.sessions.insert_one(session.to_doc())
 
     return jsonify({
         "sessionID": str(result.inserted_id)
@@ -189,8 +526,12 @@ def create_session(classID):
 
 @server.route("/api/getClassTopics/<classID>", methods=["GET"])
 def get_class_topics(classID):
+    cached = _cache_get(_topics_cache, classID)
+    if cached is not None:
+        return _conditional_json(cached)
+
     try:
-        obj_id = ObjectId(classID)
+        obj_id = _oid(classID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid classID"}), 400
 
@@ -204,12 +545,48 @@ def get_class_topics(classID):
     else:
         topics_out = topics
 
-    return jsonify(topics_out)
+    # An empty list usually means extraction is still running, so don't pin it
+    if topics_out:
+        _cache_put(_topics_cache, classID, topics_out)
+    return _conditional_json(topics_out)
+
+@server.route("/api/getSyllabus/<classID>", methods=["GET"])
+def get_syllabus(classID):
+    try:
+        obj_id = _oid(classID)
+    except bson.errors.InvalidId:
+        return jsonify({"error": "Invalid classID"}), 400
+
+    doc = mongo.classes.find_one({"_id": obj_id}, {"syllabus": 1})
+    if not doc:
+        return jsonify({"error": "Class not found"}), 404
+
+    syllabus = doc.get("syllabus") or {}
+    if syllabus.get("fileId") is None and syllabus.get("data") is not None:
+        # Classes created before the GridFS move still hold the PDF inline
+        stream = io.BytesIO(syllabus["data"])
+    else:
+        try:
+            stream = files.open_download_stream(syllabus.get("fileId"))
+        except gridfs.errors.NoFile:
+            return jsonify({"error": "Syllabus not found"}), 404
+
+    return send_file(
+        stream,
+        mimetype="application/pdf",
+        download_name=syllabus.get("filename") or "syllabus.pdf"
+    )
 
 @server.route("/api/getRecentSessions/<classID>", methods=["GET"])
 def get_recent_sessions(classID):
+    try:
+        obj_id = _oid(classID)
+    except bson.errors.InvalidId:
+        return jsonify({"error": "Invalid classID"}), 400
+
     sessions = mongo.sessions.find(
-        {"classID": classID},
+        # Older sessions still store classID as a string
+        {"classID": {"$in": [obj_id, classID]}},
         {"name": 1, "selectedTopics": 1}
     ).sort("_id", -1).limit(5)
 
@@ -225,8 +602,10 @@ def get_recent_sessions(classID):
 
 @server.route("/api/getSessionParams/<sessionID>", methods=["GET"])
 def get_session_params(sessionID):
+    # Not cached: the client reads it right after setAdaptive/updateSessionParams, which may
+    # have gone to another worker. The _id lookup is cheap and the ETag still saves the body.
     try:
-        obj_id = ObjectId(sessionID)
+        obj_id = _oid(sessionID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid sessionID"}), 400
 
@@ -248,114 +627,197 @@ def get_session_params(sessionID):
     session = {
         "name": doc.get("name", "New Session"),
         "difficulty": doc.get("difficulty", 0.5),
-        "classID": doc.get("classID", ""),
+        "classID": str(doc["classID"]) if doc.get("classID") else "",
         "isCumulative": doc.get("isCumulative", False),
         "adaptive": doc.get("adaptive", True),
         "selectedTopics": doc.get("selectedTopics", []),
         "customRequests": doc.get("customRequests", "")
     }
 
-    return jsonify(session)
+    return _conditional_json(session)
 
 @server.route("/api/requestQuestion/<sessionID>", methods=["GET"])
 def request_question(sessionID):
     try:
-        obj_id = ObjectId(sessionID)
+        obj_id = _oid(sessionID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid sessionID"}), 400
 
-    session_doc = mongo.sessions.find_one({"_id": obj_id})
+    # Only the tail of the question log feeds the prompt, so don't pull the whole history
+    session_doc = mongo.sessions.find_one(
+        {"_id": obj_id},
+        {
+            "questions": {"$slice": -HISTORY_WINDOW},
+            "classID": 1,
+            "difficulty": 1,
+            "isCumulative": 1,
+            "adaptive": 1,
+            "selectedTopics": 1,
+            "customRequests": 1
+        }
+    )
     if not session_doc:
         return jsonify({"error": "Session not found"}), 404
 
-    existing_pending = mongo.pending_questions.find_one({"sessionID": str(session_doc["_id"])})
-    if existing_pending:
-        return jsonify({
-            "questionId": existing_pending.get("questionId"),
-            "content": existing_pending.get("content")
-        })
-
-    if not ai_util:
-        return jsonify({"error": "AI module not initialized"}), 500
-
-    class_id_str = session_doc.get("classID")
-    class_doc = None
-    if class_id_str:
+    # One generation per session at a time: a double-fired request waits here and then
+    # picks up the question the first one stored instead of calling the AI again
+    with _session_lock(obj_id):
+        existing_pending = mongo.pending_questions.find_one({"sessionID": {"$in": [obj_id, sessionID]}})
+        if existing_pending and "content" not in existing_pending:
+            if not _claim_is_stale(existing_pending):
+                return _wait_for_pending(obj_id, sessionID)
+            # The worker that claimed it died mid-generation; take the session over
+            mongo.pending_questions.delete_one({"_id": existing_pending["_id"], "content": {"$exists": False}})
+            existing_pending = None
+        if existing_pending:
+            return jsonify({
+                "questionId": existing_pending.get("questionId"),
+                "content": existing_pending.get("content")
+            })
+
+        if not ai_util:
+            return jsonify({"error": "AI module not initialized"}), 500
+
+        # The lock above only covers this worker. The unique sessionID index makes this insert
+        # the guard across workers: whoever loses waits for the winner's question.
+        q_id = str(ObjectId())
         try:
-            class_doc = mongo.classes.find_one({"_id": ObjectId(class_id_str)})
-        except:
-            pass
+            mongo.pending_questions.insert_one({
+                "sessionID": obj_id,
+                "questionId": q_id,
+                "claimedAt": datetime.datetime.utcnow()
+            })
+        except pymongo.errors.DuplicateKeyError:
+            return _wait_for_pending(obj_id, sessionID)
+
+        class_id = _ref_oid(session_doc.get("classID"))
+        class_doc = None
+        if class_id:
+            class_doc = mongo.classes.find_one({"_id": class_id})
+
+        diff_float = float(session_doc.get("difficulty", 0.5))
+        difficulty_level = max(1, min(5, int(diff_float * 5)))
+
+        sess_params = SessionParameters(
+            difficulty_level=difficulty_level,
+            cumulative=session_doc.get("isCumulative", False),
+            adaptive=session_doc.get("adaptive", True),
+            focus_concepts=session_doc.get("selectedTopics", []),
+            unit_focus=None
+        )
 
-    diff_float = float(session_doc.get("difficulty", 0.5))
-    difficulty_level = max(1, min(5, int(diff_float * 5)))
+        history = [
+            {"question": q.get("content"), "correct": q.get("wasUserCorrect")}
+            for q in session_doc.get("questions", [])
+        ]
 
-    sess_params = SessionParameters(
-        difficulty_level=difficulty_level,
-        cumulative=session_doc.get("isCumulative", False),
-        adaptive=session_doc.get("adaptive", True),
-        focus_concepts=session_doc.get("selectedTopics", []),
-        unit_focus=None
-    )
+        class_file_obj = None
+        if class_doc and class_doc.get("classFile"):
+            try:
+                class_file_obj = ClassFile.from_dict(class_doc["classFile"])
+            except:
+                pass
 
-    questions = session_doc.get("questions", [])
-    history = []
-    for q in questions:
-        h_item = {
-            "question": q.get("content"),
-            "correct": q.get("wasUserCorrect"),
+        try:
+            generated_q = ai_util.generate_question(
+                session=sess_params,
+                question_answer_history=history,
+                class_file=class_file_obj,
+                user_suggestions=session_doc.get("customRequests"),
+                use_wolfram=True
+            )
+        except Exception as e:
+            print(f"Error generating question: {e}")
+            mongo.pending_questions.delete_one({"questionId": q_id})
+            return jsonify({"error": f"Failed to generate question: {str(e)}"}), 500
+
+        class_topics = class_doc.get("topics", []) if class_doc else []
+
+        pending_q = {
+            "sessionID": session_doc["_id"],
+            "questionId": q_id,
+            "content": generated_q.question,
+            "aiAnswer": generated_q.answer,
+            "wolfram_query": generated_q.wolfram_query,
+            "validation_prompt": generated_q.validation_prompt,
+            "metadata": generated_q.metadata,
+            "topics": [], # Filled in by _evaluate_pending_topics
+            "topicsPending": bool(class_topics),
         }
-        history.append(h_item)
+        mongo.pending_questions.update_one({"questionId": q_id}, {"$set": pending_q})
+        _cache_put(_pending_cache, q_id, pending_q)
 
-    class_file_obj = None
-    if class_doc and class_doc.get("classFile"):
-        try:
-            class_file_obj = ClassFile.from_dict(class_doc["classFile"])
-        except:
-            pass
+        # Topic tagging is only needed once the answer comes in, so it overlaps with the
+        # student working on the question instead of adding a second Gemini round trip here
+        if class_topics:
+            job = _ai_pool.submit(_evaluate_pending_topics, q_id, generated_q.question, class_topics)
+            _cache_put(_topic_jobs, q_id, job)
 
+        return jsonify({
+            "questionId": q_id,
+            "content": generated_q.question
+        })
+
+def _claim_is_stale(pending) -> bool:
+    claimed_at = pending.get("claimedAt")
+    return claimed_at is None or (
+        datetime.datetime.utcnow() - claimed_at
+    ).total_seconds() > PENDING_CLAIM_TIMEOUT_SECONDS
+
+def _wait_for_pending(obj_id: ObjectId, sessionID: str):
+    # Another request (possibly on another worker) is generating this session's question
+    deadline = time.monotonic() + PENDING_CLAIM_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(PENDING_POLL_SECONDS)
+        pending = mongo.pending_questions.find_one(
+            {"sessionID": {"$in": [obj_id, sessionID]}},
+            {"questionId": 1, "content": 1}
+        )
+        if pending is None:
+            return jsonify({"error": "Failed to generate question"}), 500
+        if "content" in pending:
+            return jsonify({
+                "questionId": pending.get("questionId"),
+                "content": pending.get("content")
+            })
+    return jsonify({"error": "Question is still being generated"}), 503
+
+def _evaluate_pending_topics(question_id: str, question: str, class_topics: List[str]):
     try:
-        generated_q = ai_util.generate_question(
-            session=sess_params,
-            question_answer_history=history,
-            class_file=class_file_obj,
-            user_suggestions=session_doc.get("customRequests"),
-            use_wolfram=True
+        evaluated_topics = ai_util.evaluate_question_topics(
+            question=question,
+            class_topics=class_topics
         )
     except Exception as e:
-        print(f"Error generating question: {e}")
-        return jsonify({"error": f"Failed to generate question: {str(e)}"}), 500
+        print(f"Topic evaluation failed: {e}")
+        return None
 
-    evaluated_topics = []
-    if class_doc:
-        class_topics = class_doc.get("topics", [])
-        if class_topics:
-            try:
-                evaluated_topics = ai_util.evaluate_question_topics(
-                    question=generated_q.question,
-                    class_topics=class_topics
-                )
-            except Exception as e:
-                print(f"Topic evaluation failed: {e}")
-
-    q_id = str(ObjectId())
-
-    pending_q = {
-        "sessionID": str(session_doc["_id"]),
-        "questionId": q_id,
-        "content": generated_q.question,
-        "aiAnswer": generated_q.answer,
-        "wolfram_query": generated_q.wolfram_query,
-        "validation_prompt": generated_q.validation_prompt,
-        "metadata": generated_q.metadata,
-        "topics": evaluated_topics,
-    }
-    mongo.pending_questions.insert_one(pending_q)
+    mongo.pending_questions.update_one(
+        {"questionId": question_id},
+        {"$set": {"topics": evaluated_topics, "topicsPending": False}}
+    )
+    _cache_update(_pending_cache, question_id, {"topics": evaluated_topics, "topicsPending": False})
+    return evaluated_topics
 
-    return jsonify({
-        "questionId": q_id,
-        "content": generated_q.question,
-        "topics": evaluated_topics
-    })
+def _pending_topics(question_id: str, question: str, class_topics: List[str]) -> List[str]:
+    # The answer beat the background tagging: wait for it if it runs in this worker
+    job = _cache_get(_topic_jobs, question_id)
+    if job is not None:
+        try:
+            topics = job.result(timeout=TOPIC_WAIT_SECONDS)
+            if topics is not None:
+                return topics
+        except Exception as e:
+            print(f"Waiting for topic evaluation failed: {e}")
+
+    # Tagging ran in another worker without finishing in time, or failed: tag it here
+    if not class_topics:
+        return []
+    try:
+        return ai_util.evaluate_question_topics(question=question, class_topics=class_topics)
+    except Exception as e:
+        print(f"Topic evaluation failed: {e}")
+        return []
 
 
 @server.route("/api/submitAnswer/<questionID>", methods=["POST"])
@@ -363,7 +825,7 @@ def submit_answer(questionID):
     if not ai_util:
         return jsonify({"error": "AI module not initialized"}), 500
 
-    pending = mongo.pending_questions.find_one({"questionId": questionID})
+    pending = _cache_get(_pending_cache, questionID) or mongo.pending_questions.find_one({"questionId": questionID})
     if not pending:
         return jsonify({"error": "Question not found or expired"}), 404
 
@@ -377,16 +839,11 @@ def submit_answer(questionID):
     is_correct = False
 
     system_instruction = validation_prompt or "You are a math tutor. Verify the student's answer."
-    user_prompt = json.dumps({
+    user_prompt = orjson.dumps({
         "question": question_text,
         "student_step_or_answer": user_answer,
-        "output_contract": {
-            "ok": "boolean",
-            "feedback": "string"
-        }
-    }, ensure_ascii=False)
-
-    question_topics = pending.get("topics", [])
+        "output_contract": VALIDATION_OUTPUT_CONTRACT
+    }).decode()
 
     try:
         val_res = ai_util.gemini.generate_json(
@@ -399,26 +856,19 @@ def submit_answer(questionID):
         print(f"Validation failed: {e}")
         feedback = "Could not verify answer automatically."
 
-    session_doc = mongo.sessions.find_one({"_id": ObjectId(pending["sessionID"])})
-    if session_doc:
-        class_id_str = session_doc.get("classID")
-        if class_id_str:
-            class_doc = mongo.classes.find_one({"_id": ObjectId(class_id_str)})
-            if class_doc:
-                metrics = class_doc.get("metrics", {})
-                for topic in question_topics:
-                    if topic:
-                        if topic not in metrics:
-                            metrics[topic] = asdict(Metric(rightAnswers=0, totalAnswers=0))
-                        metric_entry = metrics[topic]
-                        metric_entry["totalAnswers"] += 1
-                        if is_correct:
-                            metric_entry["rightAnswers"] += 1
-                        metrics[topic] = metric_entry
-                mongo.classes.update_one(
-                    {"_id": ObjectId(class_id_str)},
-                    {"$set": {"metrics": metrics}}
-                )
+    # Deleting the pending question claims the answer: a duplicate submit (double click, retry,
+    # another worker) finds nothing to delete and stops here instead of pushing the question and
+    # counting metrics twice. The deleted copy also has topics another worker tagged meanwhile.
+    claimed = mongo.pending_questions.find_one_and_delete(
+        {"questionId": questionID},
+        projection={"topics": 1, "topicsPending": 1}
+    )
+    _cache_pop(_pending_cache, questionID)
+    if not claimed:
+        _cache_pop(_topic_jobs, questionID)
+        return jsonify({"error": "Question not found or expired"}), 404
+
+    question_topics = [topic for topic in claimed.get("topics") or pending.get("topics", []) if topic]
 
     question_entry = Question(
         content=question_text,
@@ -429,13 +879,43 @@ def submit_answer(questionID):
         metadata=pending.get("metadata", {})
     )
 
-    mongo.sessions.update_one(
-        {"_id": ObjectId(pending["sessionID"])},
-        {"$push": {"questions": asdict(question_entry)}}
+    # The session push and the metrics update touch different collections, so run them side by side
+    session_id = _ref_oid(pending["sessionID"])
+    session_push = _write_pool.submit(
+        mongo.sessions.update_one,
+        {"_id": session_id},
+        {"$push": {"questions": question_entry.to_doc()}}
     )
 
-    # Cleanup pending? (Optional, keep for logs)
-    mongo.pending_questions.delete_one({"questionId": questionID})
+    topics_pending = not question_topics and claimed.get("topicsPending", False)
+    # No tagged topics -> nothing to record, so skip the session/class round trips entirely
+    if question_topics or topics_pending:
+        session_doc = mongo.sessions.find_one({"_id": session_id}, {"classID": 1})
+        class_id = _ref_oid(session_doc.get("classID")) if session_doc else None
+        class_doc = mongo.classes.find_one({"_id": class_id}, {"metrics": 1, "topics": 1}) if class_id else None
+        if class_doc and topics_pending:
+            question_topics = [
+                topic for topic in _pending_topics(questionID, question_text, class_doc.get("topics", []))
+                if topic
+            ]
+        if class_doc and question_topics:
+            metrics = class_doc.get("metrics", {})
+            for topic in question_topics:
+                if topic not in metrics:
+                    metrics[topic] = Metric(rightAnswers=0, totalAnswers=0).to_doc()
+                metric_entry = metrics[topic]
+                metric_entry["totalAnswers"] += 1
+                if is_correct:
+                    metric_entry["rightAnswers"] += 1
+                metrics[topic] = metric_entry
+            mongo.classes.update_one(
+                {"_id": class_id},
+                {"$set": {"metrics": metrics}}
+            )
+
+    # Wait for the push so the next requestQuestion has this question in its history
+    session_push.result()
+    _cache_pop(_topic_jobs, questionID)
 
     return jsonify({
         "isCorrect": is_correct,
@@ -446,7 +926,7 @@ def submit_answer(questionID):
 @server.route("/api/updateSessionParams/<sessionID>", methods=["POST"])
 def update_session_params(sessionID):
     try:
-        obj_id = ObjectId(sessionID)
+        obj_id = _oid(sessionID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid sessionID"}), 400
 
@@ -480,7 +960,7 @@ def update_session_params(sessionID):
 @server.route("/api/setAdaptive/<sessionID>", methods=["POST"])
 def set_adaptive(sessionID):
     try:
-        obj_id = ObjectId(sessionID)
+        obj_id = _oid(sessionID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid sessionID"}), 400
 
@@ -568,7 +1048,7 @@ def request_hint(questionID):
 @server.route("/api/editClassName/<classID>", methods=["POST"])
 def edit_class_name(classID):
     try:
-        obj_id = ObjectId(classID)
+        obj_id = _oid(classID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid classID"}), 400
 
@@ -588,7 +1068,7 @@ def edit_class_name(classID):
 @server.route("/api/editClassProf/<classID>", methods=["POST"])
 def edit_class_prof(classID):
     try:
-        obj_id = ObjectId(classID)
+        obj_id = _oid(classID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid classID"}), 400
 
@@ -608,98 +1088,119 @@ def edit_class_prof(classID):
 @server.route("/api/deleteClass/<classID>", methods=["DELETE", "POST"])
 def delete_class(classID):
     try:
-        obj_id = ObjectId(classID)
+        obj_id = _oid(classID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid classID"}), 400
 
-    result = mongo.classes.delete_one({"_id": obj_id})
-    if result.deleted_count == 0:
+    doc = mongo.classes.find_one_and_delete(
+        {"_id": obj_id},
+        projection={"syllabus.fileId": 1, "styleFiles.fileId": 1}
+    )
+    if not doc:
         return jsonify({"error": "Class not found"}), 404
+
+    _delete_files(
+        [(doc.get("syllabus") or {}).get("fileId")]
+        + [sf.get("fileId") for sf in doc.get("styleFiles", [])]
+    )
+    _cache_pop(_topics_cache, classID)
+    with _class_progress_changed:
+        _class_progress.pop(classID, None)
+        _class_progress_changed.notify_all()
     return jsonify({"status": "Class deleted"})
 
 
 @server.route("/api/deleteSession/<sessionID>", methods=["DELETE"])
 def delete_session(sessionID):
     try:
-        obj_id = ObjectId(sessionID)
+        obj_id = _oid(sessionID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid sessionID"}), 400
 
-    result = mongo.sessions.delete_one({"_id": obj_id})
-    if result.deleted_count == 0:
+    doc = mongo.sessions.find_one_and_delete({"_id": obj_id}, projection={"file.fileId": 1})
+    if not doc:
         return jsonify({"error": "Session not found"}), 404
+
+    _delete_files([(doc.get("file") or {}).get("fileId")])
     return jsonify({"status": "Session deleted"})
 
 @server.route("/api/replaceSyllabus/<classID>", methods=["POST"])
 def replace_syllabus(classID):
     try:
-        obj_id = ObjectId(classID)
+        obj_id = _oid(classID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid classID"}), 400
 
     if "syllabus" not in request.files:
         return jsonify({"error": "No syllabus file provided"}), 400
 
-    syllabus_file = request.files["syllabus"]
-    syllabus_bytes = syllabus_file.read()
-
-    syllabus_file_obj = FileUpload(
-        filename=syllabus_file.filename,
-        data=Binary(syllabus_bytes)
-    )
+    syllabus_file_obj = _upload_file(request.files["syllabus"])
 
-    result = mongo.classes.update_one(
+    # Returns the document as it was before the update, i.e. with the old syllabus fileId
+    previous = mongo.classes.find_one_and_update(
         {"_id": obj_id},
-        {"$set": {"syllabus": asdict(syllabus_file_obj)}}
+        {"$set": {"syllabus": syllabus_file_obj.to_doc()}},
+        projection={"syllabus.fileId": 1}
     )
 
-    if result.matched_count == 0:
+    if not previous:
+        _delete_files([syllabus_file_obj.fileId])
         return jsonify({"error": "Class not found"}), 404
+
+    _delete_files([(previous.get("syllabus") or {}).get("fileId")])
+    _cache_pop(_topics_cache, classID)
     return jsonify({"status": "Syllabus replaced"})
 
 @server.route("/api/uploadStyleDocs/<classID>", methods=["POST"])
 def upload_style_docs(classID):
     try:
-        obj_id = ObjectId(classID)
+        obj_id = _oid(classID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid classID"}), 400
 
-    style_files = []
-    for sf in request.files.getlist("styleFiles"):
-        if sf and sf.filename:
-            style_files.append(FileUpload(
-                filename=sf.filename,
-                data=Binary(sf.read())
-            ))
+    style_files = [
+        _upload_file(sf)
+        for sf in request.files.getlist("styleFiles")
+        if sf and sf.filename
+    ]
     if not style_files:
         return jsonify({"error": "No style files provided"}), 400
     result = mongo.classes.update_one(
         {"_id": obj_id},
-        {"$push": {"styleFiles": {"$each": [asdict(sf) for sf in style_files]}}}
+        {"$push": {"styleFiles": {"$each": [sf.to_doc() for sf in style_files]}}}
     )
     if result.matched_count == 0:
+        _delete_files([sf.fileId for sf in style_files])
         return jsonify({"error": "Class not found"}), 404
+    _cache_pop(_topics_cache, classID)
     return jsonify({"status": "Style docs uploaded"})
 
 @server.route("/api/deleteStyleDoc/<classID>/<docName>", methods=["DELETE"])
 def delete_style_doc(classID, docName):
     try:
-        obj_id = ObjectId(classID)
+        obj_id = _oid(classID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid classID"}), 400
 
-    result = mongo.classes.update_one(
+    previous = mongo.classes.find_one_and_update(
         {"_id": obj_id},
-        {"$pull": {"styleFiles": {"filename": docName}}}
+        {"$pull": {"styleFiles": {"filename": docName}}},
+        projection={"styleFiles": 1}
     )
-    if result.matched_count == 0:
+    if not previous:
         return jsonify({"error": "Class not found"}), 404
+
+    _delete_files([
+        sf.get("fileId")
+        for sf in previous.get("styleFiles", [])
+        if sf.get("filename") == docName
+    ])
     return jsonify({"status": "Style doc deleted"})
 
 @server.route("/api/getStyleDocs/<classID>", methods=["GET"])
 def get_style_docs(classID):
     try:
-        obj_id = ObjectId(classID)
+        obj_id = _oid(classID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid classID"}), 400
 
@@ -716,17 +1217,30 @@ def get_style_docs(classID):
 
 @server.route("/api/getMetrics/<classID>", methods=["GET"])
 def get_metrics(classID):
+    # Not cached: the metrics page is read right after submitAnswer, which may have gone to
+    # another worker. The ETag still saves the body when nothing changed.
     try:
-        obj_id = ObjectId(classID)
+        obj_id = _oid(classID)
     except bson.errors.InvalidId:
         return jsonify({"error": "Invalid classID"}), 400
 
     doc = mongo.classes.find_one({"_id": obj_id}, {"metrics": 1})
     if not doc:
         return jsonify({"error": "Class not found"}), 404
-    metrics = doc.get("metrics", {})
-    return jsonify(metrics)
+    return _conditional_json(doc.get("metrics", {}))
+
 
+@server.after_request
+def static_cache_headers(response):
+    if request.endpoint == "static" and response.status_code in (200, 304):
+        if is_hashed_asset(request.view_args.get("filename", "")):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+    return response
 
 @server.route("/", defaults={"path": ""})
 @server.route("/<path:path>")
@@ -734,7 +1248,10 @@ def spa(path):
     if path.startswith("api"):
         return jsonify({"error": "API route not found"}), 404
 
-    return server.send_static_file("index.html")
+    # Revalidated on every load (ETag -> 304)
+    response = send_from_directory(server.static_folder, "index.html", conditional=True, max_age=0)
+    response.cache_control.no_cache = True
+    return response
 
 if __name__ == '__main__':
     server.run(port=8080)
@@ -1,24 +1,69 @@
+from __future__ import annotations
+
+import hashlib
 import json
+import os
 import random
+import secrets
+import sys
+import threading
 import time
 from dataclasses import dataclass
-from typing import List
-
-from bson import ObjectId, Binary
-from flask import Flask, jsonify, request
-
-server = Flask(__name__, static_folder="frontend/dist", static_url_path="")
-
-@dataclass
+from functools import lru_cache, wraps
+from itertools import count
+from typing import TYPE_CHECKING, List
+
+import orjson
+from flask import Blueprint, Flask, abort, request
+from flask_compress import Compress
+from whitenoise import WhiteNoise
+
+from backend.json_provider import OrjsonProvider
+from backend.static_assets import is_hashed_asset
+
+if TYPE_CHECKING:
+    # Only the dataclass annotations use these; the mock never loads pymongo's bson
+    from bson import Binary, ObjectId
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "dist")
+
+# Static files are served by WhiteNoise below, so Flask gets no static route of its own
+server = Flask(__name__, static_folder=None)
+server.json = OrjsonProvider(server)
+server.url_map.strict_slashes = False
+
+def static_headers(headers, path, url):
+    if path.endswith(".html"):
+        headers["Cache-Control"] = "no-cache"
+
+# WhiteNoise answers for files in the build (index.html included) before Flask routing
+# runs; client-side routes still fall through to the spa() view below.
+server.wsgi_app = WhiteNoise(
+    server.wsgi_app,
+    root=STATIC_DIR,
+    index_file=True,
+    autorefresh=False,
+    immutable_file_test=lambda path, url: is_hashed_asset(url),
+    add_headers_function=static_headers,
+)
+server.config["COMPRESS_MIMETYPES"] = ["application/json"]
+server.config["COMPRESS_LEVEL"] = 6
+Compress(server)
+
+# Explicit __slots__ rather than dataclass(slots=True), which needs Python 3.10 and the
+# Docker image ships 3.9; none of these fields have defaults, so the two don't clash.
+@dataclass(frozen=True)
 class Question:
+    __slots__ = ("questionId", "content", "userAnswer", "aiAnswer", "wasUserCorrect")
     questionId: ObjectId
     content: str
     userAnswer: str
     aiAnswer: str
     wasUserCorrect: bool
 
-@dataclass
+@dataclass(frozen=True)
 class Session:
+    __slots__ = ("sessionID", "name", "questions", "adaptive", "difficulty", "isCumulative", "focusedConcepts", "file")
     sessionID: ObjectId
     name: str
     questions: List[Question]
@@ -28,8 +73,9 @@ class Session:
     focusedConcepts: List[str]
     file: Binary
 
-@dataclass
+@dataclass(frozen=True)
 class Class:
+    __slots__ = ("classID", "syllabus", "styleFiles", "name", "professor", "topics", "sessions")
     classID: ObjectId
     syllabus: Binary
     styleFiles: List[Binary]
@@ -38,15 +84,17 @@ class Class:
     topics: List[str]
     sessions: List[Session]
 
+# Demo classes and sessions are loaded unless SEED_DATA=0, which starts the mock empty
+SEED_DATA = os.environ.get("SEED_DATA", "1").lower() not in ("0", "false", "no")
+
 class_cards = [
     {"classID": 1, "name": "Mathematics", "professor": "Dr. Karthik", "topics": ["Algebra", "Geometry", "Calculus", "Statistics"]},
     {"classID": 2, "name": "Science", "professor": "Dr. Joseph", "topics": ["Biology", "Chemistry", "Physics", "Ecology", "Astronomy", "Geology"]},
     {"classID": 3, "name": "History", "professor": "Dr. Max", "topics": ["Ancient", "Medieval", "Modern", "World Wars"]}
 ]
 
-sessions_store = [
-    {
-        "sessionID": "S1001",
+sessions_store = {
+    "S1001": {
         "classID": "1",
         "name": "Quick warmup",
         "difficulty": 0.4,
@@ -55,8 +103,7 @@ sessions_store = [
         "selectedTopics": ["Algebra"],
         "customRequests": ""
     },
-    {
-        "sessionID": "S1002",
+    "S1002": {
         "classID": "1",
         "name": "Mixed review",
         "difficulty": 0.7,
@@ -65,8 +112,7 @@ sessions_store = [
         "selectedTopics": ["Geometry", "Calculus", "Algebra"],
         "customRequests": "Focus on proofs"
     },
-    {
-        "sessionID": "S1003",
+    "S1003": {
         "classID": "2",
         "name": "Concept check",
         "difficulty": 0.5,
@@ -75,8 +121,7 @@ sessions_store = [
         "selectedTopics": ["Biology", "Chemistry"],
         "customRequests": ""
     },
-    {
-        "sessionID": "S1004",
+    "S1004": {
         "classID": "1",
         "name": "Single topic sprint",
         "difficulty": 0.3,
@@ -85,57 +130,310 @@ sessions_store = [
         "selectedTopics": ["Calculus"],
         "customRequests": "Only word problems"
     }
-]
+}
+
+if not SEED_DATA:
+    class_cards.clear()
+    sessions_store.clear()
+
+class_cards_by_id = {card["classID"]: card for card in class_cards}
+_class_id_seq = count(max(class_cards_by_id, default=0) + 1)
+_class_lock = threading.Lock()
+
+# Simulated backend latency for frontend demos. Each view's delay is scaled by
+# FAKE_LATENCY_MULT, which defaults to 1 with DEMO_DELAYS set and 0 (no sleeping) otherwise.
+DEMO_DELAYS = os.environ.get("DEMO_DELAYS", "").lower() in ("1", "true", "yes")
+FAKE_LATENCY_MULT = float(os.environ.get("FAKE_LATENCY_MULT", "1" if DEMO_DELAYS else "0"))
+
+def fake_latency(seconds):
+    delay = seconds * FAKE_LATENCY_MULT
+
+    def decorator(view):
+        if delay <= 0:
+            return view
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            time.sleep(delay)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+_TRUTHY = frozenset((True, 1, "1", "true", "True", "TRUE", "yes", "on"))
+
+def is_truthy(value):
+    try:
+        return value in _TRUTHY
+    except TypeError:
+        # Unhashable payload values (lists, dicts) are never a "true" flag
+        return False
+
+def request_args():
+    # Read fields from whichever body the client actually sent instead of probing both
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        return payload if isinstance(payload, dict) else {}
+    return request.form
+
+def pick(args, *keys, default=None):
+    # First key the client actually sent, stopping at the first hit; unlike an `or`
+    # chain, 0 and False count as sent
+    get = args.get
+    for key in keys:
+        value = get(key)
+        if value is not None and value != "":
+            return value
+    return default
+
+def intern_topics(topics):
+    # Topic names repeat across every class card and session; keep one string object per name
+    return [sys.intern(topic) for topic in topics if isinstance(topic, str)]
+
+for _card in class_cards:
+    _card["topics"] = intern_topics(_card["topics"])
+for _session in sessions_store.values():
+    _session["selectedTopics"] = intern_topics(_session["selectedTopics"])
 
 def find_session(session_id):
-    for session in sessions_store:
-        if session.get("sessionID") == session_id:
-            return session
-    return None
+    return sessions_store.get(session_id)
+
+# Version counters back the weak ETags on the class card/topic reads; the epoch keeps
+# tags from a previous process (whose in-memory data is gone) from matching.
+_ETAG_EPOCH = format(time.time_ns(), "x")
+_class_cards_version = 0
+_class_topics_versions = {}
+
+# Serialized list bodies, rebuilt lazily after a mutation drops them. The per-class ones
+# are bounded LRUs since any classID in a URL would otherwise add an entry.
+_class_cards_json = None
+
+def bump_class_cards(class_id=None):
+    global _class_cards_version, _class_cards_json
+    _class_cards_version += 1
+    _class_cards_json = None
+    if class_id is not None:
+        _class_topics_versions[class_id] = _class_topics_versions.get(class_id, 0) + 1
+        class_topics_json.cache_clear()
+
+def json_body(body):
+    return server.response_class(body, mimetype="application/json")
+
+def body_etag(body):
+    return hashlib.md5(body).hexdigest()
+
+def etagged_json(body, etag=None):
+    # Revalidate every time (max-age=0), but an unchanged body comes back as a bodiless 304
+    etag = etag or body_etag(body)
+    if etag_matches(etag):
+        response = server.response_class(status=304)
+    else:
+        response = json_body(body)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 0
+    return response
+
+def ojson(obj):
+    # Same bytes as jsonify() through OrjsonProvider, minus the current_app proxy lookups
+    return json_body(orjson.dumps(obj))
+
+def class_cards_json():
+    global _class_cards_json
+    if _class_cards_json is None:
+        _class_cards_json = orjson.dumps(class_cards)
+    return _class_cards_json
+
+@lru_cache(maxsize=512)
+def class_topics_json(class_id):
+    card = class_cards_by_id.get(class_id)
+    topics = card.get("topics", []) if card else []
+    return orjson.dumps([{"title": t} for t in topics])
+
+@lru_cache(maxsize=512)
+def recent_sessions_json(class_id):
+    # Walk newest-first and stop at five instead of building every match for the class
+    sessions = []
+    for session_id, session in reversed(sessions_store.items()):
+        if session.get("classID") != class_id:
+            continue
+        sessions.append({
+            "sessionID": session_id,
+            "name": session.get("name", "Untitled Session"),
+            "topics": session.get("selectedTopics", []) or []
+        })
+        if len(sessions) == 5:
+            break
+    sessions.reverse()
+    body = orjson.dumps(sessions)
+    return body, body_etag(body)
+
+def etag_matches(etag):
+    # Flask-Compress sends compressed bodies with the tag rewritten to "<etag>:gzip" (or :br, ...),
+    # and that is what the browser echoes back in If-None-Match
+    if_none_match = request.if_none_match
+    return if_none_match.contains_weak(etag) or any(
+        if_none_match.contains_weak(f"{etag}:{algorithm}")
+        for algorithm in server.config["COMPRESS_ALGORITHM"]
+    )
 
-@server.route("/api/hello")
+def versioned_response(etag, build):
+    if etag_matches(etag):
+        response = server.response_class(status=304)
+    else:
+        response = build()
+    response.set_etag(etag, weak=True)
+    return response
+
+_HELLO_BODY = orjson.dumps({"message": "API Working!"})
+
+_QUESTIONS = (
+    {"questionId": "Q101", "content": "What is the capital of France?"},
+    {"questionId": "Q102", "content": "Solve for x: 2x + 5 = 17."},
+    {"questionId": "Q103", "content": "Compute the derivative of $f(x)=x^2$."},
+    {"questionId": "Q104", "content": "Evaluate the integral $\\int_0^1 3x^2\\,dx$."},
+    {"questionId": "Q105", "content": "If $a^2+b^2=c^2$ with $a=3$ and $b=4$, find $c$."},
+    {"questionId": "Q106", "content": "Simplify: $\\frac{2}{x} + \\frac{3}{x} = ?$"},
+    {"questionId": "Q107", "content": "What is the slope of the line through $(1,2)$ and $(3,6)$?"},
+    {"questionId": "Q108", "content": "Convert $0.75$ to a fraction."},
+    {"questionId": "Q109", "content": "Solve: $\\sin(\\pi/2)$ = ?"},
+    {"questionId": "Q110", "content": "Find the area of a circle with radius $r$."}
+)
+
+_FEEDBACK = (
+    {
+        "isCorrect": True,
+        "correctAnswer": "Paris",
+        "whyIsWrong": ""
+    },
+    {
+        "isCorrect": True,
+        "correctAnswer": "$x=6$",
+        "whyIsWrong": ""
+    },
+    {
+        "isCorrect": True,
+        "correctAnswer": "$f'(x)=2x$",
+        "whyIsWrong": ""
+    },
+    {
+        "isCorrect": False,
+        "correctAnswer": "$x=6$",
+        "whyIsWrong": "Isolate $x$ by subtracting 5 first, then divide by 2."
+    },
+    {
+        "isCorrect": False,
+        "correctAnswer": "$\\int_0^1 3x^2\\,dx = 1$",
+        "whyIsWrong": "Use the antiderivative $x^3$ and evaluate from 0 to 1."
+    },
+    {
+        "isCorrect": False,
+        "correctAnswer": "$c=5$",
+        "whyIsWrong": "Apply the Pythagorean theorem: $3^2+4^2=9+16=25$."
+    },
+    {
+        "isCorrect": False,
+        "correctAnswer": "$\\sin(\\pi/2)=1$",
+        "whyIsWrong": "On the unit circle, $\\pi/2$ corresponds to the point $(0,1)$."
+    }
+)
+
+_HINTS = (
+    {"hint": "It's the largest planet in our solar system."},
+    {"hint": "It's the process by which plants make food using sunlight."},
+    {"hint": "It's the formula to calculate the area of a triangle."},
+    {"hint": "It's the chemical symbol for water."},
+    {"hint": "It's the term for animals that eat only plants."}
+)
+
+# Fixed {"status": ...} bodies, serialized once; each request still gets its own Response
+_ACKS = {
+    status: orjson.dumps({"status": status})
+    for status in (
+        "Syllabus replaced",
+        "Style docs uploaded",
+        "Style doc deleted",
+        "Session parameters updated",
+        "Adaptive learning set",
+        "Class name updated",
+        "Class professor updated",
+        "Class deleted",
+        "Session deleted",
+    )
+}
+
+def ack(status):
+    return json_body(_ACKS[status])
+
+_QUESTION_BODIES = tuple(orjson.dumps(question) for question in _QUESTIONS)
+_FEEDBACK_BODIES = tuple(orjson.dumps(feedback) for feedback in _FEEDBACK)
+_HINT_BODIES = tuple(orjson.dumps(hint) for hint in _HINTS)
+_HINT_ETAGS = tuple(body_etag(body) for body in _HINT_BODIES)
+_N_QUESTIONS = len(_QUESTION_BODIES)
+_N_FEEDBACK = len(_FEEDBACK_BODIES)
+_N_HINTS = len(_HINT_BODIES)
+
+# Bound method of the module generator: one call and a tuple index per pick. It has to be
+# the shared instance, which CPython reseeds after fork; a private Random() would hand
+# every forked worker the same sequence.
+_rand = random.randrange
+
+_DEFAULT_SESSION_PARAMS_BODY = orjson.dumps({
+    "name": "Midterm review",
+    "difficulty": 0.6,
+    "classID": "",
+    "isCumulative": False,
+    "adaptive": True,
+    "selectedTopics": ["Algebra"],
+    "customRequests": ""
+})
+_DEFAULT_SESSION_PARAMS_ETAG = body_etag(_DEFAULT_SESSION_PARAMS_BODY)
+
+# Every JSON endpoint lives under /api; the SPA fallback stays on the app itself
+api = Blueprint("api", __name__, url_prefix="/api")
+
+@api.route("/hello")
 def hello():
-    return jsonify({"message": "API Working!"})
+    return json_body(_HELLO_BODY)
 
-@server.route("/api/getClassCards")
+@api.route("/getClassCards")
 def get_class_cards():
-    return jsonify(class_cards)
+    etag = f"cc-{_ETAG_EPOCH}-{_class_cards_version}"
+    return versioned_response(etag, lambda: json_body(class_cards_json()))
 
-@server.route("/api/createClass", methods=["POST"])
+@api.route("/createClass", methods=["POST"])
+@fake_latency(1.5)
 def create_class():
-    time.sleep(1.5)
-    payload = request.get_json(silent=True) or {}
-    name = (
-        request.form.get("Name")
-        or request.form.get("name")
-        or payload.get("Name")
-        or payload.get("name")
-        or "Untitled class"
-    )
-    professor = (
-        request.form.get("Professor")
-        or request.form.get("professor")
-        or payload.get("Professor")
-        or payload.get("professor")
-        or "Instructor"
-    )
-    next_id = max(card["classID"] for card in class_cards) + 1 if class_cards else 1
-    class_cards.append({"classID": next_id, "name": name, "professor": professor, "topics": []})
-    return jsonify({"classID": str(next_id)})
-
-@server.route("/api/createSession/<classID>", methods=["POST"])
+    args = request_args()
+    name = pick(args, "Name", "name", default="Untitled class")
+    professor = pick(args, "Professor", "professor", default="Instructor")
+    with _class_lock:
+        next_id = next(_class_id_seq)
+        card = {"classID": next_id, "name": name, "professor": professor, "topics": []}
+        class_cards.append(card)
+        class_cards_by_id[next_id] = card
+        bump_class_cards(next_id)
+    return ojson({"classID": str(next_id)})
+
+@api.route("/createSession/<classID>", methods=["POST"])
+@fake_latency(1.2)
 def create_session(classID):
-    time.sleep(1.2)
-    payload = request.get_json(silent=True) or {}
-    name = request.form.get("name") or payload.get("name") or "New Session"
-    difficulty = request.form.get("difficulty") or payload.get("difficulty") or 0.5
-    adaptive = request.form.get("adaptive") or payload.get("adaptive") or False
-    cumulative = request.form.get("cumulative") or payload.get("cumulative") or False
-    custom_requests = request.form.get("customRequests") or payload.get("customRequests") or ""
-
-    selected_topics = request.form.getlist("selectedTopics")
+    args = request_args()
+    name = pick(args, "name", default="New Session")
+    adaptive = pick(args, "adaptive", default=False)
+    cumulative = pick(args, "cumulative", default=False)
+    custom_requests = pick(args, "customRequests", default="")
+    difficulty = pick(args, "difficulty", default=0.5)
+    if isinstance(difficulty, bool):
+        return ojson({"error": "Invalid difficulty"}), 400
+    try:
+        difficulty = float(difficulty)
+    except (TypeError, ValueError):
+        return ojson({"error": "Invalid difficulty"}), 400
+
+    # Only multipart/urlencoded bodies carry repeated selectedTopics fields
+    selected_topics = [] if request.is_json else request.form.getlist("selectedTopics")
     if not selected_topics:
-        raw_topics = payload.get("selectedTopics") or request.form.get("selectedTopics") or payload.get("topics")
+        raw_topics = args.get("selectedTopics") or args.get("topics")
         if isinstance(raw_topics, str):
             try:
                 parsed = json.loads(raw_topics)
@@ -148,74 +446,58 @@ def create_session(classID):
         elif isinstance(raw_topics, list):
             selected_topics = raw_topics
 
-    session_id = f"S{random.randint(1000, 9999)}"
-    sessions_store.append({
-        "sessionID": session_id,
+    session_id = f"S{secrets.token_hex(5)}"
+    sessions_store[session_id] = {
         "name": name,
-        "difficulty": float(difficulty),
+        "difficulty": difficulty,
         "classID": classID,
-        "isCumulative": str(cumulative).lower() == "true",
-        "adaptive": str(adaptive).lower() == "true",
-        "selectedTopics": selected_topics,
+        "isCumulative": is_truthy(cumulative),
+        "adaptive": is_truthy(adaptive),
+        "selectedTopics": intern_topics(selected_topics),
         "customRequests": custom_requests
-    })
-    return jsonify({"sessionID": session_id})
+    }
+    recent_sessions_json.cache_clear()
+    return ojson({"sessionID": session_id})
 
-@server.route("/api/replaceSyllabus/<classID>", methods=["POST"])
+@api.route("/replaceSyllabus/<classID>", methods=["POST"])
+@fake_latency(1.2)
 def replace_syllabus(classID):
-    time.sleep(1.2)
-    return jsonify({"status": "Syllabus replaced"})
+    return ack("Syllabus replaced")
 
-@server.route("/api/uploadStyleDocs/<classID>", methods=["POST"])
+@api.route("/uploadStyleDocs/<classID>", methods=["POST"])
+@fake_latency(1.4)
 def upload_style_docs(classID):
-    time.sleep(1.4)
-    return jsonify({"status": "Style docs uploaded"})
+    return ack("Style docs uploaded")
 
-@server.route("/api/deleteStyleDoc/<classID>/<docName>", methods=["DELETE"])
+@api.route("/deleteStyleDoc/<classID>/<docName>", methods=["DELETE"])
+@fake_latency(0.8)
 def delete_style_doc(classID, docName):
-    time.sleep(0.8)
-    return jsonify({"status": "Style doc deleted"})
+    return ack("Style doc deleted")
 
-@server.route("/api/getStyleDocs/<classID>", methods=["GET"])
+@api.route("/getStyleDocs/<classID>", methods=["GET"])
+@fake_latency(0.4)
 def get_style_docs(classID):
-    time.sleep(0.4)
-    return jsonify([
+    return ojson([
         {"filename": "lecture-notes.pdf"},
         {"filename": "style-guide.md"}
     ])
 
-@server.route("/api/getClassTopics/<classID>")
+@api.route("/getClassTopics/<classID>")
 def get_class_topics(classID):
     try:
         class_id = int(classID)
     except ValueError:
-        return jsonify({"error": "Invalid classID"}), 400
-
-    for card in class_cards:
-        if card["classID"] == class_id:
-            return jsonify([{"title": t} for t in card.get("topics", [])])
-
-    return jsonify([])
-
-@server.route("/api/getMetrics/<classID>", methods=["GET"])
-def get_metrics(classID):
-    try:
-        class_id = int(classID)
-    except ValueError:
-        return jsonify({"error": "Invalid classID"}), 400
-
-    topics = []
-    for card in class_cards:
-        if card["classID"] == class_id:
-            topics = card.get("topics", [])
-            break
+        return ojson({"error": "Invalid classID"}), 400
 
-    if not topics:
-        return jsonify([])
+    etag = f"ct-{_ETAG_EPOCH}-{class_id}-{_class_topics_versions.get(class_id, 0)}"
+    return versioned_response(etag, lambda: json_body(class_topics_json(class_id)))
 
+@lru_cache(maxsize=64)
+def metrics_json(class_id, topics):
+    # Fake stats stay stable per class until its topic list (part of the key) changes;
+    # sample() picks without reordering the card's own topic list
     target = max(1, round(len(topics) * 0.5))
-    random.shuffle(topics)
-    selected = topics[:target]
+    selected = random.sample(topics, target)
 
     metrics = []
     for topic in selected:
@@ -226,204 +508,151 @@ def get_metrics(classID):
             "totalAnswers": total_answers,
             "rightAnswers": right_answers
         })
-    return jsonify(metrics)
+    return orjson.dumps(metrics)
+
+@api.route("/getMetrics/<classID>", methods=["GET"])
+def get_metrics(classID):
+    try:
+        class_id = int(classID)
+    except ValueError:
+        return ojson({"error": "Invalid classID"}), 400
+
+    card = class_cards_by_id.get(class_id)
+    topics = card.get("topics", []) if card else []
+
+    if not topics:
+        return ojson([])
+
+    return json_body(metrics_json(class_id, tuple(topics)))
 
-@server.route("/api/getRecentSessions/<classID>")
+@api.route("/getRecentSessions/<classID>")
 def get_recent_sessions(classID):
-    sessions = [
-        {
-            "sessionID": session["sessionID"],
-            "name": session.get("name", "Untitled Session"),
-            "topics": session.get("selectedTopics", []) or []
-        }
-        for session in sessions_store
-        if session.get("classID") == classID
-    ]
-    return jsonify(sessions[-5:])
+    return etagged_json(*recent_sessions_json(classID))
 
-@server.route("/api/getSessionParams/<sessionID>")
+@api.route("/getSessionParams/<sessionID>")
 def get_session_params(sessionID):
     session_params = find_session(sessionID)
     if session_params:
-        return jsonify({k: v for k, v in session_params.items() if k != "sessionID"})
-    return jsonify({
-        "name": "Midterm review",
-        "difficulty": 0.6,
-        "classID": "",
-        "isCumulative": False,
-        "adaptive": True,
-        "selectedTopics": ["Algebra"],
-        "customRequests": ""
-    })
+        return etagged_json(orjson.dumps(session_params))
+    return etagged_json(_DEFAULT_SESSION_PARAMS_BODY, _DEFAULT_SESSION_PARAMS_ETAG)
 
-@server.route("/api/requestQuestion/<sessionID>")
+@api.route("/requestQuestion/<sessionID>")
+@fake_latency(2)
 def request_question(sessionID):
-    questions = [
-        {"questionId": "Q101", "content": "What is the capital of France?"},
-        {"questionId": "Q102", "content": "Solve for x: 2x + 5 = 17."},
-        {"questionId": "Q103", "content": "Compute the derivative of $f(x)=x^2$."},
-        {"questionId": "Q104", "content": "Evaluate the integral $\\int_0^1 3x^2\\,dx$."},
-        {"questionId": "Q105", "content": "If $a^2+b^2=c^2$ with $a=3$ and $b=4$, find $c$."},
-        {"questionId": "Q106", "content": "Simplify: $\\frac{2}{x} + \\frac{3}{x} = ?$"},
-        {"questionId": "Q107", "content": "What is the slope of the line through $(1,2)$ and $(3,6)$?"},
-        {"questionId": "Q108", "content": "Convert $0.75$ to a fraction."},
-        {"questionId": "Q109", "content": "Solve: $\\sin(\\pi/2)$ = ?"},
-        {"questionId": "Q110", "content": "Find the area of a circle with radius $r$."}
-    ]
-    time.sleep(2)
-    return jsonify(random.choice(questions))
-
-@server.route("/api/submitAnswer/<questionID>", methods=["POST"])
+    return json_body(_QUESTION_BODIES[_rand(_N_QUESTIONS)])
+
+@api.route("/submitAnswer/<questionID>", methods=["POST"])
 def submit_answer(questionID):
-    feedback_bank = [
-        {
-            "isCorrect": True,
-            "correctAnswer": "Paris",
-            "whyIsWrong": ""
-        },
-        {
-            "isCorrect": True,
-            "correctAnswer": "$x=6$",
-            "whyIsWrong": ""
-        },
-        {
-            "isCorrect": True,
-            "correctAnswer": "$f'(x)=2x$",
-            "whyIsWrong": ""
-        },
-        {
-            "isCorrect": False,
-            "correctAnswer": "$x=6$",
-            "whyIsWrong": "Isolate $x$ by subtracting 5 first, then divide by 2."
-        },
-        {
-            "isCorrect": False,
-            "correctAnswer": "$\\int_0^1 3x^2\\,dx = 1$",
-            "whyIsWrong": "Use the antiderivative $x^3$ and evaluate from 0 to 1."
-        },
-        {
-            "isCorrect": False,
-            "correctAnswer": "$c=5$",
-            "whyIsWrong": "Apply the Pythagorean theorem: $3^2+4^2=9+16=25$."
-        },
-        {
-            "isCorrect": False,
-            "correctAnswer": "$\\sin(\\pi/2)=1$",
-            "whyIsWrong": "On the unit circle, $\\pi/2$ corresponds to the point $(0,1)$."
-        }
-    ]
-    return jsonify(random.choice(feedback_bank))
-
-@server.route("/api/updateSessionParams/<sessionID>", methods=["POST"])
+    return json_body(_FEEDBACK_BODIES[_rand(_N_FEEDBACK)])
+
+@api.route("/updateSessionParams/<sessionID>", methods=["POST"])
 def update_session_params(sessionID):
-    return jsonify({"status": "Session parameters updated"})
-
-@server.route("/api/setAdaptive/<sessionID>", methods=["POST"])
-def set_adaptive(sessionID):
-    payload = request.get_json(silent=True) or {}
-    if "active" in payload:
-        adaptive = bool(payload.get("active"))
-    elif "adaptive" in payload:
-        adaptive = bool(payload.get("adaptive"))
-    elif "active" in request.form:
-        adaptive = request.form.get("active").lower() == "true"
-    elif "adaptive" in request.form:
-        adaptive = request.form.get("adaptive").lower() == "true"
-    else:
-        adaptive = False
+    return ack("Session parameters updated")
 
-    session = find_session(sessionID)
-    if session:
-        session["adaptive"] = adaptive
-    return jsonify({"status": "Adaptive learning set"})
+@api.route("/setAdaptive/<sessionID>", methods=["POST"])
+@api.route("/setAdaptive/<sessionID>/<setting>", methods=["POST"])
+def set_adaptive(sessionID, setting=None):
+    if setting is not None:
+        value = setting
+    else:
+        args = request_args()
+        value = args.get("active", args.get("adaptive"))
+    adaptive = is_truthy(value)
 
-@server.route("/api/setAdaptive/<sessionID>/<setting>", methods=["POST"])
-def set_adaptive_legacy(sessionID, setting):
-    adaptive = setting.lower() == "true"
     session = find_session(sessionID)
     if session:
         session["adaptive"] = adaptive
-    return jsonify({"status": "Adaptive learning set"})
+    return ack("Adaptive learning set")
 
-@server.route("/api/requestHint/<questionID>", methods=["GET", "POST"])
+@api.route("/requestHint/<questionID>", methods=["GET", "POST"])
 def request_hint(questionID):
-    hints = [
-        {"hint": "It's the largest planet in our solar system."},
-        {"hint": "It's the process by which plants make food using sunlight."},
-        {"hint": "It's the formula to calculate the area of a triangle."},
-        {"hint": "It's the chemical symbol for water."},
-        {"hint": "It's the term for animals that eat only plants."}
-    ]
-    hint = {
-        "hint": random.choice(hints)["hint"]
-    }
-    return jsonify(hint)
+    index = _rand(_N_HINTS)
+    return etagged_json(_HINT_BODIES[index], _HINT_ETAGS[index])
 
-@server.route("/api/editClassName/<classID>", methods=["POST"])
+@api.route("/editClassName/<classID>", methods=["POST"])
 def edit_class_name(classID):
     try:
         class_id = int(classID)
     except ValueError:
-        return jsonify({"error": "Invalid classID"}), 400
+        return ojson({"error": "Invalid classID"}), 400
 
     new_name = request.form.get("name")
     if not new_name:
-        return jsonify({"error": "No name provided"}), 400
+        return ojson({"error": "No name provided"}), 400
 
-    for card in class_cards:
-        if card["classID"] == class_id:
-            card["name"] = new_name
-            return jsonify({"status": "Class name updated"})
+    card = class_cards_by_id.get(class_id)
+    if card is None:
+        return ojson({"error": "Class not found"}), 404
+    card["name"] = new_name
+    bump_class_cards()
+    return ack("Class name updated")
 
-    return jsonify({"error": "Class not found"}), 404
-
-@server.route("/api/editClassProf/<classID>", methods=["POST"])
+@api.route("/editClassProf/<classID>", methods=["POST"])
 def edit_class_prof(classID):
     try:
         class_id = int(classID)
     except ValueError:
-        return jsonify({"error": "Invalid classID"}), 400
+        return ojson({"error": "Invalid classID"}), 400
 
     new_professor = request.form.get("professor")
     if not new_professor:
-        return jsonify({"error": "No professor name provided"}), 400
-
-    for card in class_cards:
-        if card["classID"] == class_id:
-            card["professor"] = new_professor
-            return jsonify({"status": "Class professor updated"})
+        return ojson({"error": "No professor name provided"}), 400
 
-    return jsonify({"error": "Class not found"}), 404
+    card = class_cards_by_id.get(class_id)
+    if card is None:
+        return ojson({"error": "Class not found"}), 404
+    card["professor"] = new_professor
+    bump_class_cards()
+    return ack("Class professor updated")
 
-@server.route("/api/deleteClass/<classID>", methods=["DELETE", "POST"])
+@api.route("/deleteClass/<classID>", methods=["DELETE", "POST"])
 def delete_class(classID):
     try:
         class_id = int(classID)
     except ValueError:
-        return jsonify({"error": "Invalid classID"}), 400
+        return ojson({"error": "Invalid classID"}), 400
 
-    for index, card in enumerate(class_cards):
-        if card["classID"] == class_id:
-            class_cards.pop(index)
-            return jsonify({"status": "Class deleted"})
+    with _class_lock:
+        card = class_cards_by_id.pop(class_id, None)
+        if card is None:
+            return ojson({"error": "Class not found"}), 404
+        class_cards.remove(card)
+        bump_class_cards(class_id)
+    return ack("Class deleted")
 
-    return jsonify({"error": "Class not found"}), 404
-
-@server.route("/api/deleteSession/<sessionID>", methods=["DELETE"])
+@api.route("/deleteSession/<sessionID>", methods=["DELETE"])
 def delete_session(sessionID):
-    for index, session in enumerate(sessions_store):
-        if session.get("sessionID") == sessionID:
-            sessions_store.pop(index)
-            return jsonify({"status": "Session deleted"})
-    return jsonify({"error": "Session not found"}), 404
+    if sessions_store.pop(sessionID, None) is not None:
+        recent_sessions_json.cache_clear()
+        return ack("Session deleted")
+    return ojson({"error": "Session not found"}), 404
+
+server.register_blueprint(api)
+
+def load_index_html():
+    try:
+        with open(os.path.join(STATIC_DIR, "index.html"), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+# Read once like WhiteNoise's autorefresh=False; client-side route hits skip the stat/open
+INDEX_HTML = load_index_html()
+INDEX_ETAG = hashlib.md5(INDEX_HTML).hexdigest() if INDEX_HTML is not None else None
 
 @server.route("/", defaults={"path": ""})
 @server.route("/<path:path>")
 def spa(path):
     if path.startswith("api"):
-        return jsonify({"error": "API route not found"}), 404
+        return ojson({"error": "API route not found"}), 404
+    if INDEX_HTML is None:
+        abort(404)
 
-    return server.send_static_file("index.html")
+    response = server.response_class(INDEX_HTML, mimetype="text/html")
+    response.set_etag(INDEX_ETAG)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 if __name__ == '__main__':
+    # Werkzeug dev server for local UI work; serve with gunicorn (see Procfile) otherwise
     server.run(port=8080)
@@ -10,29 +10,25 @@ This intentionally avoids external dependencies so it works in a fresh venv.
 from __future__ import annotations
 
 import os
+import re
 import subprocess
 from typing import Dict
 
+# One KEY=value per line; comment lines start with "#" and lines without "=" never match
+_DOTENV_RE = re.compile(r"^[ \t]*([^#\s=][^=\n]*?)[ \t]*=[ \t]*(.*?)[ \t]*\r?$", re.MULTILINE)
+
 
 def _parse_dotenv(path: str) -> Dict[str, str]:
-    pairs: Dict[str, str] = {}
     try:
         with open(path, "r", encoding="utf-8") as fh:
-            for raw in fh:
-                line = raw.strip()
-                if not line or line.startswith("#"):
-                    continue
-                if "=" not in line:
-                    continue
-                key, val = line.split("=", 1)
-                key = key.strip()
-                val = val.strip()
-                if (val.startswith("\"") and val.endswith("\"")) or (
-                    val.startswith("\'") and val.endswith("\'")):
-                    val = val[1:-1]
-                pairs[key] = val
+            data = fh.read()
     except FileNotFoundError:
         return {}
+    pairs: Dict[str, str] = {}
+    for key, val in _DOTENV_RE.findall(data):
+        if val[:1] in ("\"", "\'") and val[-1:] == val[:1]:
+            val = val[1:-1]
+        pairs[key] = val
     return pairs
 
 
@@ -43,13 +39,15 @@ def load(path: str = ".env", override: bool = False) -> None:
         path: path to .env file (default: .env)
         override: if True, overwrite existing environment variables
     """
-    for k, v in _parse_dotenv(path).items():
-        if override or k not in os.environ:
-            os.environ[k] = v
+    pending = {k: v for k, v in _parse_dotenv(path).items() if override or k not in os.environ}
+    os.environ.update(pending)
 
 
 def run_command_with_env(cmd: list[str]) -> int:
-    """Run a command (list form) with the current process environment and return exit code."""
+    """Run a command (list form) with the current process environment and return exit code.
+
+    The CLI's --exec doesn't use this; it replaces this process with the command instead.
+    """
     return subprocess.run(cmd, env=os.environ).returncode
 
 
@@ -69,7 +67,7 @@ if __name__ == "__main__":
         cmd = args.exec
         if not cmd:
             parser.error("--exec requires a command to run")
-        rc = run_command_with_env(cmd)
-        raise SystemExit(rc)
+        # Nothing runs after the command, so exec it in place rather than fork and wait
+        os.execvpe(cmd[0], cmd, os.environ)
     else:
         print(f"Loaded environment from {args.env_file}")
\ No newline at end of file
@@ -3,12 +3,35 @@ from unittest.mock import MagicMock, patch
 import sys
 import os
 import json
+import time
+import datetime
+import threading
+import types
+from io import BytesIO
+import gridfs.errors
+import pymongo.errors
 from bson import ObjectId
 
-# Mocking modules before importing main_ai
-sys.modules["backend.mongo"] = MagicMock()
-sys.modules["sophi_ai"] = MagicMock()
-sys.modules["wolfram_checker"] = MagicMock()
+def _stub(name, **attrs):
+    # Plain module with only the names main imports, instead of a MagicMock that
+    # invents a child mock for every attribute touched
+    module = types.ModuleType(name)
+    vars(module).update(attrs)
+    return module
+
+# Stubbing modules before importing main_ai. The Mongo handles and the AI util stay
+# mocks since the tests configure and assert on them.
+sys.modules["backend.mongo"] = _stub("backend.mongo", connect=MagicMock(), bucket=MagicMock())
+sys.modules["sophi_ai"] = _stub(
+    "sophi_ai",
+    SophiAIUtil=MagicMock,
+    SessionParameters=types.SimpleNamespace,
+    ClassFile=MagicMock(),
+    GeneratedQuestion=types.SimpleNamespace,
+    ValidationResult=types.SimpleNamespace,
+    HintResponse=types.SimpleNamespace,
+)
+sys.modules["wolfram_checker"] = _stub("wolfram_checker", WolframAlphaChecker=MagicMock)
 
 # Add the project root to sys.path so we can import main_ai
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -26,6 +49,8 @@ class TestMainAI(unittest.TestCase):
         self.mock_sessions = self.mock_mongo.sessions
         self.mock_classes = self.mock_mongo.classes
         self.mock_pending = self.mock_mongo.pending_questions
+        # submitAnswer claims the pending question by deleting it
+        self.mock_pending.find_one_and_delete.return_value = {"topics": []}
         
         # Mock AI Util
         self.mock_ai = main.ai_util
@@ -47,13 +72,17 @@ class TestMainAI(unittest.TestCase):
             "questions": []
         }
         
+        # No question already pending for this session
+        self.mock_pending.find_one.return_value = None
+        
         # Setup mock AI generation
-        mock_q = MagicMock()
-        mock_q.question = "Solve x+1=2"
-        mock_q.answer = "x=1"
-        mock_q.wolfram_query = "Solve x+1=2"
-        mock_q.validation_prompt = "Validate this."
-        mock_q.metadata = {}
+        mock_q = types.SimpleNamespace(
+            question="Solve x+1=2",
+            answer="x=1",
+            wolfram_query="Solve x+1=2",
+            validation_prompt="Validate this.",
+            metadata={}
+        )
         self.mock_ai.generate_question.return_value = mock_q
         
         response = self.app.get(f"/api/requestQuestion/{session_id}")
@@ -66,9 +95,39 @@ class TestMainAI(unittest.TestCase):
         # Verify pending question was inserted
         self.mock_pending.insert_one.assert_called_once()
 
+    def test_request_question_claimed_by_other_worker(self):
+        session_id = str(ObjectId())
+        
+        self.mock_sessions.find_one.return_value = {
+            "_id": ObjectId(session_id),
+            "difficulty": 0.5,
+            "questions": []
+        }
+        
+        # Another worker inserted the session's pending row first and fills it in meanwhile
+        self.mock_pending.find_one.side_effect = [
+            None,
+            {"questionId": "other_q_id"},
+            {"questionId": "other_q_id", "content": "Solve x+5=6"}
+        ]
+        self.mock_pending.insert_one.side_effect = pymongo.errors.DuplicateKeyError("sessionID")
+        self.mock_ai.generate_question.reset_mock()
+        
+        try:
+            with patch.object(main, "PENDING_POLL_SECONDS", 0):
+                response = self.app.get(f"/api/requestQuestion/{session_id}")
+        finally:
+            self.mock_pending.find_one.side_effect = None
+            self.mock_pending.insert_one.side_effect = None
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data, {"questionId": "other_q_id", "content": "Solve x+5=6"})
+        self.mock_ai.generate_question.assert_not_called()
+
     def test_submit_answer(self):
         question_id = "test_q_id"
-        session_id = str(ObjectId())
+        session_id = ObjectId()
         
         # Setup mock pending question
         self.mock_pending.find_one.return_value = {
@@ -97,6 +156,117 @@ class TestMainAI(unittest.TestCase):
         # Verify session was updated
         self.mock_sessions.update_one.assert_called_once()
 
+    def test_submit_answer_already_claimed(self):
+        question_id = "answered_q_id"
+        
+        # Another submit for the same question deleted the pending document first
+        self.mock_pending.find_one.return_value = {
+            "questionId": question_id,
+            "sessionID": ObjectId(),
+            "content": "Solve x+4=5",
+            "aiAnswer": "x=1",
+            "validation_prompt": "Validate",
+            "metadata": {}
+        }
+        self.mock_pending.find_one_and_delete.return_value = None
+        self.mock_ai.gemini.generate_json.return_value = {
+            "ok": True,
+            "feedback": "Good job"
+        }
+        self.mock_sessions.update_one.reset_mock()
+        
+        response = self.app.post(f"/api/submitAnswer/{question_id}", 
+                                 json={"answer": "x=1"})
+        
+        self.assertEqual(response.status_code, 404)
+        self.mock_sessions.update_one.assert_not_called()
+
+    def test_submit_answer_legacy_string_session_id(self):
+        question_id = "legacy_q_id"
+        session_id = ObjectId()
+        
+        # Pending question written before sessionID was stored as an ObjectId
+        self.mock_pending.find_one.return_value = {
+            "questionId": question_id,
+            "sessionID": str(session_id),
+            "content": "Solve x+3=4",
+            "aiAnswer": "x=1",
+            "validation_prompt": "Validate",
+            "metadata": {}
+        }
+        self.mock_ai.gemini.generate_json.return_value = {
+            "ok": True,
+            "feedback": "Good job"
+        }
+        self.mock_sessions.update_one.reset_mock()
+        
+        response = self.app.post(f"/api/submitAnswer/{question_id}", 
+                                 json={"answer": "x=1"})
+        
+        self.assertEqual(response.status_code, 200)
+        args, _ = self.mock_sessions.update_one.call_args
+        self.assertEqual(args[0], {"_id": session_id})
+
+    def test_submit_answer_tags_topics_still_pending(self):
+        question_id = "untagged_q_id"
+        session_id = ObjectId()
+        class_id = ObjectId()
+        
+        # Answer arrived before the background topic tagging stored anything
+        self.mock_pending.find_one.return_value = {
+            "questionId": question_id,
+            "sessionID": session_id,
+            "content": "Differentiate x^2",
+            "aiAnswer": "2x",
+            "validation_prompt": "Validate",
+            "metadata": {},
+            "topics": [],
+            "topicsPending": True
+        }
+        self.mock_sessions.find_one.return_value = {"_id": session_id, "classID": class_id}
+        self.mock_classes.find_one.return_value = {"_id": class_id, "topics": ["Derivatives"], "metrics": {}}
+        self.mock_pending.find_one_and_delete.return_value = {"topics": [], "topicsPending": True}
+        self.mock_ai.evaluate_question_topics.reset_mock()
+        self.mock_ai.evaluate_question_topics.return_value = ["Derivatives"]
+        self.mock_ai.gemini.generate_json.return_value = {
+            "ok": True,
+            "feedback": "Good job"
+        }
+        self.mock_classes.update_one.reset_mock()
+        
+        response = self.app.post(f"/api/submitAnswer/{question_id}", 
+                                 json={"answer": "2x"})
+        
+        self.assertEqual(response.status_code, 200)
+        self.mock_ai.evaluate_question_topics.assert_called_once()
+        args, _ = self.mock_classes.update_one.call_args
+        self.assertEqual(args[1]["$set"]["metrics"]["Derivatives"], {"rightAnswers": 1, "totalAnswers": 1})
+
+    def test_submit_answer_uses_cached_pending(self):
+        question_id = "cached_q_id"
+        
+        # Pending question generated by this worker, still in the local cache
+        main._cache_put(main._pending_cache, question_id, {
+            "questionId": question_id,
+            "sessionID": ObjectId(),
+            "content": "Solve x+2=3",
+            "aiAnswer": "x=1",
+            "validation_prompt": "Validate",
+            "metadata": {}
+        })
+        self.mock_pending.find_one.reset_mock()
+        self.mock_ai.gemini.generate_json.return_value = {
+            "ok": True,
+            "feedback": "Good job"
+        }
+        
+        response = self.app.post(f"/api/submitAnswer/{question_id}", 
+                                 json={"answer": "x=1"})
+        
+        self.assertEqual(response.status_code, 200)
+        self.mock_pending.find_one.assert_not_called()
+        self.assertIsNone(main._cache_get(main._pending_cache, question_id))
+
     def test_request_hint(self):
         question_id = "test_q_id"
         
@@ -107,9 +277,12 @@ class TestMainAI(unittest.TestCase):
         }
         
         # Setup mock AI hint
-        mock_hint = MagicMock()
-        mock_hint.text = "Subtract 1"
-        mock_hint.kind = "hint"
+        mock_hint = types.SimpleNamespace(
+            text="Subtract 1",
+            kind="hint",
+            hint_type="Strategic",
+            wolfram_query=None
+        )
         self.mock_ai.generate_hint.return_value = mock_hint
         
         response = self.app.get(f"/api/requestHint/{question_id}")
@@ -129,10 +302,14 @@ class TestMainAI(unittest.TestCase):
         }
         
         # Mock AI class file generation
-        mock_class_file = MagicMock()
-        mock_class_file.to_dict.return_value = {"syllabus": {}, "concepts": ["Limits"]}
-        mock_class_file.concepts = ["Limits"]
-        self.mock_ai.create_class_file_from_pdfs.return_value = mock_class_file
+        mock_class_file = types.SimpleNamespace(
+            to_dict=lambda: {"syllabus": {}, "concepts": ["Limits"]},
+            concepts=["Limits"]
+        )
+        self.mock_ai.create_class_file_from_bytes.return_value = mock_class_file
+        
+        # Syllabus not seen before
+        self.mock_mongo.class_file_cache.find_one.return_value = None
         
         # Mock Mongo insert
         self.mock_classes.insert_one.return_value.inserted_id = ObjectId()
@@ -140,14 +317,158 @@ class TestMainAI(unittest.TestCase):
         response = self.app.post("/api/createClass", data=data, content_type='multipart/form-data')
         
         self.assertEqual(response.status_code, 200)
-        self.mock_ai.create_class_file_from_pdfs.assert_called_once()
         self.mock_classes.insert_one.assert_called_once()
         
-        # Verify inserted data has classFile and topics
+        # Class is inserted right away, before the AI has run
+        args, _ = self.mock_classes.insert_one.call_args
+        inserted_doc = args[0]
+        self.assertEqual(inserted_doc["topics"], [])
+        self.assertIsNone(inserted_doc["classFile"])
+        
+        # Wait for the background worker, then verify it filled in classFile and topics
+        main._class_jobs.join()
+        self.mock_ai.create_class_file_from_bytes.assert_called_once()
+        updates = [args[1]["$set"] for args, _ in self.mock_classes.update_one.call_args_list]
+        update = next(u for u in updates if "classFile" in u)
+        self.assertEqual(update["topics"], ["Limits"])
+        self.assertIsNotNone(update["classFile"])
+        
+        # Final progress is stored on the class so any worker can report it
+        self.assertEqual(updates[-1]["classFileProgress"]["status"], "done")
+        self.assertNotIn(json.loads(response.data)["classID"], main._class_progress)
+
+    def test_create_class_cached_syllabus(self):
+        from io import BytesIO
+        data = {
+            "syllabus": (BytesIO(b"Known syllabus"), "syllabus.pdf"),
+            "name": "Calculus 102",
+        }
+        
+        # Syllabus already extracted for another class
+        self.mock_mongo.class_file_cache.find_one.return_value = {
+            "classFile": {"class_name": "Calculus 101", "concepts": ["Limits"]},
+            "topics": ["Limits"]
+        }
+        self.mock_ai.create_class_file_from_bytes.reset_mock()
+        self.mock_classes.insert_one.reset_mock()
+        self.mock_classes.update_one.reset_mock()
+        self.mock_classes.insert_one.return_value.inserted_id = ObjectId()
+        
+        response = self.app.post("/api/createClass", data=data, content_type='multipart/form-data')
+        
+        self.assertEqual(response.status_code, 200)
+        main._class_jobs.join()
+        self.mock_ai.create_class_file_from_bytes.assert_not_called()
+        
         args, _ = self.mock_classes.insert_one.call_args
         inserted_doc = args[0]
         self.assertEqual(inserted_doc["topics"], ["Limits"])
-        self.assertIsNotNone(inserted_doc["classFile"])
+        self.assertEqual(inserted_doc["classFile"]["class_name"], "Calculus 102")
+        
+        # Progress is reported as done right away
+        args, _ = self.mock_classes.update_one.call_args
+        self.assertEqual(args[1]["$set"]["classFileProgress"]["status"], "done")
+
+    def test_class_progress_no_job(self):
+        class_id = str(ObjectId())
+        self.mock_classes.find_one.return_value = {"_id": ObjectId(class_id)}
+        
+        response = self.app.get(f"/api/classProgress/{class_id}")
+        
+        self.assertEqual(response.status_code, 404)
+
+    def test_class_progress_streams_stored_done(self):
+        class_id = str(ObjectId())
+        
+        # Job finished on another worker; only the class document knows about it
+        self.mock_classes.find_one.return_value = {
+            "classFileProgress": {"status": "done", "pct": 100, "updatedAt": datetime.datetime.utcnow()}
+        }
+        
+        response = self.app.get(f"/api/classProgress/{class_id}")
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        self.assertEqual(response.data, b'data: {"status":"done","pct":100}\n\n')
+
+    def test_class_progress_stale_job_fails(self):
+        class_id = str(ObjectId())
+        
+        # The worker running the job went away without finishing it
+        self.mock_classes.find_one.return_value = {
+            "classFileProgress": {
+                "status": "extracting",
+                "pct": 40,
+                "updatedAt": datetime.datetime.utcnow() - datetime.timedelta(hours=1)
+            }
+        }
+        
+        response = self.app.get(f"/api/classProgress/{class_id}")
+        
+        self.assertEqual(response.data, b'data: {"status":"failed","pct":100}\n\n')
+
+    def test_class_progress_ends_when_class_deleted(self):
+        class_id = str(ObjectId())
+        self.mock_classes.find_one.return_value = None
+        main._publish_progress(class_id, "extracting", 40)
+        
+        def delete_class():
+            time.sleep(0.1)
+            self.app.delete(f"/api/deleteClass/{class_id}")
+        
+        deleter = threading.Thread(target=delete_class)
+        with patch.object(main, "PROGRESS_POLL_SECONDS", 0.01):
+            deleter.start()
+            response = self.app.get(f"/api/classProgress/{class_id}")
+            data = response.data
+        deleter.join()
+        
+        self.assertEqual(data, b'data: {"status":"extracting","pct":40}\n\n')
+        self.assertNotIn(class_id, main._class_progress)
+
+    def test_get_syllabus_from_gridfs(self):
+        class_id = str(ObjectId())
+        self.mock_classes.find_one.return_value = {
+            "syllabus": {"filename": "calc.pdf", "fileId": ObjectId()}
+        }
+        main.files.open_download_stream.side_effect = None
+        main.files.open_download_stream.return_value = BytesIO(b"%PDF-gridfs")
+        
+        response = self.app.get(f"/api/getSyllabus/{class_id}")
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/pdf")
+        self.assertEqual(response.data, b"%PDF-gridfs")
+        self.assertIn("calc.pdf", response.headers["Content-Disposition"])
+
+    def test_get_syllabus_legacy_inline_data(self):
+        class_id = str(ObjectId())
+        
+        # Class created before uploads moved to GridFS
+        self.mock_classes.find_one.return_value = {
+            "syllabus": {"filename": "old.pdf", "data": b"%PDF-inline"}
+        }
+        main.files.open_download_stream.reset_mock()
+        
+        response = self.app.get(f"/api/getSyllabus/{class_id}")
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b"%PDF-inline")
+        main.files.open_download_stream.assert_not_called()
+
+    def test_get_syllabus_missing_file(self):
+        class_id = str(ObjectId())
+        self.mock_classes.find_one.return_value = {
+            "syllabus": {"filename": "gone.pdf", "fileId": ObjectId()}
+        }
+        main.files.open_download_stream.side_effect = gridfs.errors.NoFile
+        
+        try:
+            response = self.app.get(f"/api/getSyllabus/{class_id}")
+        finally:
+            main.files.open_download_stream.side_effect = None
+        
+        self.assertEqual(response.status_code, 404)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+
+# No demo sleeps in tests
+os.environ.setdefault("FAKE_LATENCY_MULT", "0")
+
+# Add the project root to sys.path so we can import mainNoMongo
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import mainNoMongo
+
+class TestMainNoMongo(unittest.TestCase):
+    def setUp(self):
+        self.app = mainNoMongo.server.test_client()
+        self.app.testing = True
+
+    def test_class_cards_revalidate_gzip(self):
+        # Enough classes that the body is over COMPRESS_MIN_SIZE and goes out gzipped
+        for i in range(10):
+            self.app.post("/api/createClass", data={"name": f"Compressed class {i}", "professor": "Dr. Gzip"})
+
+        response = self.app.get("/api/getClassCards", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers.get("Content-Encoding"), "gzip")
+        etag = response.headers["ETag"]
+        self.assertTrue(etag.endswith(':gzip"'))
+
+        # The browser sends back the compressed tag it was given
+        response = self.app.get(
+            "/api/getClassCards",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b"")
+
+    def test_recent_sessions_revalidate_gzip(self):
+        class_id = self.app.post("/api/createClass", data={"name": "Sessions class"}).get_json()["classID"]
+        for i in range(5):
+            self.app.post(f"/api/createSession/{class_id}", data={"name": f"Session {i} " + "x" * 100})
+
+        response = self.app.get(f"/api/getRecentSessions/{class_id}", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers.get("Content-Encoding"), "gzip")
+        etag = response.headers["ETag"]
+
+        response = self.app.get(
+            f"/api/getRecentSessions/{class_id}",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_create_session_zero_difficulty(self):
+        # "0" and 0 are real difficulties, not "missing" (which falls back to 0.5)
+        for difficulty, body in (("0", {"data": {"difficulty": "0"}}), (0, {"json": {"difficulty": 0}})):
+            response = self.app.post("/api/createSession/1", **body)
+            self.assertEqual(response.status_code, 200)
+            session_id = response.get_json()["sessionID"]
+            self.assertEqual(mainNoMongo.sessions_store[session_id]["difficulty"], 0.0, difficulty)
+
+    def test_create_session_default_difficulty(self):
+        response = self.app.post("/api/createSession/1", data={"name": "No difficulty"})
+        session_id = response.get_json()["sessionID"]
+        self.assertEqual(mainNoMongo.sessions_store[session_id]["difficulty"], 0.5)
+
+    def test_create_session_rejects_bad_difficulty(self):
+        for difficulty in (True, False, "hard", [0.5]):
+            response = self.app.post("/api/createSession/1", json={"difficulty": difficulty})
+            self.assertEqual(response.status_code, 400, difficulty)
+
+if __name__ == "__main__":
+    unittest.main()
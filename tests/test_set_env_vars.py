@@ -0,0 +1,69 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the project root to sys.path so we can import set_env_vars
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import set_env_vars
+
+DOTENV = (
+    "# comment line\n"
+    "   # indented comment\n"
+    "\n"
+    "PLAIN=value\n"
+    "  INDENTED = spaced value  \n"
+    "URI=mongodb://host/?retryWrites=true&w=majority\n"
+    "DOUBLE=\"quoted value\"\n"
+    "SINGLE='single quoted'\n"
+    "MISMATCHED=\"half quoted\n"
+    "INLINE=a # not a comment\n"
+    "EMPTY=\n"
+    "NO_EQUALS_LINE\n"
+    "CRLF=windows\r\n"
+    "LAST=no trailing newline"
+)
+
+class TestParseDotenv(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".env")
+        # Binary write so the \r\n line survives as-is
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(DOTENV.encode("utf-8"))
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_parse(self):
+        self.assertEqual(set_env_vars._parse_dotenv(self.path), {
+            "PLAIN": "value",
+            "INDENTED": "spaced value",
+            "URI": "mongodb://host/?retryWrites=true&w=majority",
+            "DOUBLE": "quoted value",
+            "SINGLE": "single quoted",
+            "MISMATCHED": "\"half quoted",
+            "INLINE": "a # not a comment",
+            "EMPTY": "",
+            "CRLF": "windows",
+            "LAST": "no trailing newline",
+        })
+
+    def test_missing_file(self):
+        self.assertEqual(set_env_vars._parse_dotenv(self.path + ".missing"), {})
+
+    def test_load_keeps_existing_unless_override(self):
+        os.environ["PLAIN"] = "from environment"
+        try:
+            set_env_vars.load(self.path)
+            self.assertEqual(os.environ["PLAIN"], "from environment")
+            self.assertEqual(os.environ["DOUBLE"], "quoted value")
+
+            set_env_vars.load(self.path, override=True)
+            self.assertEqual(os.environ["PLAIN"], "value")
+        finally:
+            for key in set_env_vars._parse_dotenv(self.path):
+                os.environ.pop(key, None)
+
+if __name__ == "__main__":
+    unittest.main()
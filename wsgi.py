@@ -0,0 +1,13 @@
+"""Gevent entrypoint for the in-memory mock server.
+
+Usage:
+  gunicorn -c gunicorn.conf.py -w 1 wsgi:server
+
+Patching has to happen before mainNoMongo (and Flask/Werkzeug) import the stdlib, so
+the fake_latency sleeps and the class lock become cooperative greenlet waits.
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+from mainNoMongo import server  # noqa: E402